@@ -15,8 +15,10 @@ from app.models.auction import Auction
 from app.models.actor import Actor
 from app.models.lot import Lot
 from app.models.invoice import Invoice
+from app.models.invoice_checkpoint import InvoiceChainCheckpoint
 from app.models.audit_log import AuditLog
 from app.models.settlement import Settlement
+from app.models.settlement_batch import SettlementBatch
 from app.core.config import settings
 
 # this is the Alembic Config object, which provides
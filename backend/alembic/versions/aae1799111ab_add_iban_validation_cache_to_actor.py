@@ -0,0 +1,26 @@
+"""add iban validation cache to actor
+
+Revision ID: aae1799111ab
+Revises: b782d0b9d3ee
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'aae1799111ab'
+down_revision = 'b782d0b9d3ee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('actor', sa.Column('iban_hash', sa.String(), nullable=True))
+    op.add_column('actor', sa.Column('iban_valid', sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('actor', 'iban_valid')
+    op.drop_column('actor', 'iban_hash')
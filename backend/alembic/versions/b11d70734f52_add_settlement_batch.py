@@ -0,0 +1,90 @@
+"""add settlement batch
+
+Revision ID: b11d70734f52
+Revises: dcb7e419c478
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+import gzip
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b11d70734f52'
+down_revision = 'dcb7e419c478'
+branch_labels = None
+depends_on = None
+
+
+def _header_value(xml: str, tag: str) -> str:
+    match = re.search(rf"<{tag}>([^<]*)</{tag}>", xml)
+    return match.group(1) if match else None
+
+
+def upgrade() -> None:
+    op.create_table('settlementbatch',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('nb_of_txs', sa.Integer(), nullable=False),
+    sa.Column('control_sum', sa.Float(), nullable=False),
+    sa.Column('xml_gz', sa.LargeBinary(), nullable=True),
+    sa.Column('storage_key', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_settlementbatch_id'), 'settlementbatch', ['id'], unique=False)
+    op.create_index(op.f('ix_settlementbatch_message_id'), 'settlementbatch', ['message_id'], unique=True)
+    op.create_index(op.f('ix_settlementbatch_created_at'), 'settlementbatch', ['created_at'], unique=False)
+    op.add_column('settlement', sa.Column('batch_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_settlement_batch_id'), 'settlement', ['batch_id'], unique=False)
+    op.create_foreign_key('settlement_batch_id_fkey', 'settlement', 'settlementbatch', ['batch_id'], ['id'])
+
+    # Move each distinct SEPA document into a single compressed batch row
+    conn = op.get_bind()
+    batch_table = sa.table('settlementbatch',
+        sa.column('id', sa.Integer), sa.column('message_id', sa.String),
+        sa.column('nb_of_txs', sa.Integer), sa.column('control_sum', sa.Float),
+        sa.column('xml_gz', sa.LargeBinary), sa.column('created_at', sa.DateTime),
+    )
+    rows = conn.execute(sa.text(
+        "SELECT xml_content, min(created_at) FROM settlement "
+        "WHERE xml_content IS NOT NULL GROUP BY xml_content"
+    )).fetchall()
+    for index, (xml, created_at) in enumerate(rows):
+        batch_id = conn.execute(
+            batch_table.insert().values(
+                message_id=_header_value(xml, 'MsgId') or f"LEGACY-{index + 1}",
+                nb_of_txs=int(_header_value(xml, 'NbOfTxs') or 0),
+                control_sum=float(_header_value(xml, 'CtrlSum') or 0),
+                xml_gz=gzip.compress(xml.encode('utf-8')),
+                created_at=created_at,
+            ).returning(batch_table.c.id)
+        ).scalar()
+        conn.execute(
+            sa.text("UPDATE settlement SET batch_id = :batch_id WHERE xml_content = :xml"),
+            {"batch_id": batch_id, "xml": xml},
+        )
+
+    op.drop_column('settlement', 'xml_content')
+
+
+def downgrade() -> None:
+    op.add_column('settlement', sa.Column('xml_content', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, xml_gz FROM settlementbatch WHERE xml_gz IS NOT NULL")).fetchall()
+    for batch_id, xml_gz in rows:
+        conn.execute(
+            sa.text("UPDATE settlement SET xml_content = :xml WHERE batch_id = :batch_id"),
+            {"xml": gzip.decompress(xml_gz).decode('utf-8'), "batch_id": batch_id},
+        )
+
+    op.drop_constraint('settlement_batch_id_fkey', 'settlement', type_='foreignkey')
+    op.drop_index(op.f('ix_settlement_batch_id'), table_name='settlement')
+    op.drop_column('settlement', 'batch_id')
+    op.drop_index(op.f('ix_settlementbatch_created_at'), table_name='settlementbatch')
+    op.drop_index(op.f('ix_settlementbatch_message_id'), table_name='settlementbatch')
+    op.drop_index(op.f('ix_settlementbatch_id'), table_name='settlementbatch')
+    op.drop_table('settlementbatch')
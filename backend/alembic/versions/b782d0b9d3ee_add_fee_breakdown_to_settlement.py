@@ -0,0 +1,28 @@
+"""add fee breakdown to settlement
+
+Revision ID: b782d0b9d3ee
+Revises: b11d70734f52
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b782d0b9d3ee'
+down_revision = 'b11d70734f52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('settlement', sa.Column('hammer_total', sa.Float(), nullable=True))
+    op.add_column('settlement', sa.Column('seller_fees', sa.Float(), nullable=True))
+    op.add_column('settlement', sa.Column('seller_fees_vat', sa.Float(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('settlement', 'seller_fees_vat')
+    op.drop_column('settlement', 'seller_fees')
+    op.drop_column('settlement', 'hammer_total')
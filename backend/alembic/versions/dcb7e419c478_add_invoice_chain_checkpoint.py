@@ -0,0 +1,35 @@
+"""add invoice chain checkpoint
+
+Revision ID: dcb7e419c478
+Revises: merge_heads_1
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dcb7e419c478'
+down_revision = 'merge_heads_1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('invoicechaincheckpoint',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('hash', sa.String(), nullable=False),
+    sa.Column('verified_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoice.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_invoicechaincheckpoint_id'), 'invoicechaincheckpoint', ['id'], unique=False)
+    op.create_index(op.f('ix_invoicechaincheckpoint_invoice_id'), 'invoicechaincheckpoint', ['invoice_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_invoicechaincheckpoint_invoice_id'), table_name='invoicechaincheckpoint')
+    op.drop_index(op.f('ix_invoicechaincheckpoint_id'), table_name='invoicechaincheckpoint')
+    op.drop_table('invoicechaincheckpoint')
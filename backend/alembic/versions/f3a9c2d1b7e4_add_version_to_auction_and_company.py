@@ -0,0 +1,26 @@
+"""add version to auction and company settings
+
+Revision ID: f3a9c2d1b7e4
+Revises: aae1799111ab
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c2d1b7e4'
+down_revision = 'aae1799111ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('auction', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('company_settings', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('company_settings', 'version')
+    op.drop_column('auction', 'version')
@@ -1,50 +1,64 @@
-from typing import Generator, Optional
+from typing import Generator, NamedTuple, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
+from app.core.cache import SharedCache
 from app.core.config import settings
 from app.db.session import get_db
-from app.models.user import User
+from app.models.user import User, UserRole
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
+class CurrentUser(NamedTuple):
+    """
+    What authorization needs from the authenticated user, cached per process.
+    """
+    id: int
+    role: UserRole
+    is_active: Optional[bool]
+
+# user id -> CurrentUser; users.py publishes the invalidations
+current_users = SharedCache("users", maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL, key_type=int)
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     token: str = Depends(reusable_oauth2)
-) -> User:
+) -> CurrentUser:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = payload.get("sub")
-    except (JWTError, ValidationError):
+        user_id = int(payload.get("sub"))
+    except (JWTError, ValidationError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    
-    # In a real app, we would fetch the user from DB here
-    # user = await crud.user.get(db, id=token_data)
-    # For now, we just return a mock or implement simple query
-    # Since we haven't set up CRUD yet, we'll leave it as a placeholder
-    # But to be correct, let's do a raw query or use select
-    from sqlalchemy import select
-    result = await db.execute(select(User).where(User.id == int(token_data)))
-    user = result.scalars().first()
-    
-    if not user:
+
+    async def load() -> Optional[CurrentUser]:
+        result = await db.execute(
+            select(User.id, User.role, User.is_active).where(User.id == user_id)
+        )
+        row = result.first()
+        return CurrentUser(*row) if row else None
+
+    user = await current_users.get_or_load(user_id, load)
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
-    from app.models.user import UserRole
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="The user doesn't have enough privileges"
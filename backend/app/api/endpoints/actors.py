@@ -5,9 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.api import deps
+from app.core.serialization import ORJSONResponse, rows_to_dicts
 from app.models.actor import Actor, ActorType
-from app.models.user import User, UserRole
+from app.models.user import UserRole
 from app.schemas.actor import Actor as ActorSchema, ActorCreate, ActorUpdate
+from app.services.actor_service import actor_ids
+from app.services.version_service import VersionService
 
 router = APIRouter()
 
@@ -17,25 +20,28 @@ async def read_actors(
     skip: int = 0,
     limit: int = 100,
     type: ActorType = None,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Retrieve actors.
     """
-    query = select(Actor).offset(skip).limit(limit)
+    # Schema columns only, serialized straight from the rows
+    query = select(
+        Actor.id, Actor.name, Actor.type, Actor.email, Actor.phone_number,
+        Actor.siren_siret, Actor.address, Actor.iban, Actor.bic, Actor.vat_subject,
+    ).offset(skip).limit(limit)
     if type:
         query = query.filter(Actor.type == type)
     
     result = await db.execute(query)
-    actors = result.scalars().all()
-    return actors
+    return ORJSONResponse(rows_to_dicts(result))
 
 @router.post("/", response_model=ActorSchema)
 async def create_actor(
     *,
     db: AsyncSession = Depends(deps.get_db),
     actor_in: ActorCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Create new actor.
@@ -71,7 +77,7 @@ async def update_actor(
     db: AsyncSession = Depends(deps.get_db),
     id: int,
     actor_in: ActorUpdate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Update an actor.
@@ -89,6 +95,9 @@ async def update_actor(
         setattr(actor, field, value)
     
     db.add(actor)
+    await VersionService.bump_auctions_of_actor(db, actor.id)
+    # Lookups are keyed by name and email, which may have changed
+    await actor_ids.publish(db)
     await db.commit()
     await db.refresh(actor)
     return actor
@@ -98,7 +107,7 @@ async def delete_actor(
     *,
     db: AsyncSession = Depends(deps.get_db),
     id: int,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Delete an actor.
@@ -112,5 +121,6 @@ async def delete_actor(
         raise HTTPException(status_code=404, detail="Actor not found")
     
     await db.delete(actor)
+    await actor_ids.publish(db)
     await db.commit()
     return actor
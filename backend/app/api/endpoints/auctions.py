@@ -6,8 +6,8 @@ from sqlalchemy.future import select
 from sqlalchemy import func
 from app.api import deps
 from app.models.auction import Auction, AuctionStatus
-from app.models.user import User
 from app.schemas.auction import AuctionCreate, AuctionUpdate, AuctionResponse
+from app.services.auction_service import auction_fees
 
 router = APIRouter()
 
@@ -16,7 +16,7 @@ async def read_auctions(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Retrieve auctions.
@@ -30,7 +30,7 @@ async def create_auction(
     *,
     db: AsyncSession = Depends(deps.get_db),
     auction_in: AuctionCreate,
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Create new auction.
@@ -66,7 +66,7 @@ async def read_auction(
     *,
     db: AsyncSession = Depends(deps.get_db),
     id: int,
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Get auction by ID.
@@ -83,7 +83,7 @@ async def update_auction(
     db: AsyncSession = Depends(deps.get_db),
     id: int,
     auction_in: AuctionUpdate,
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Update an auction.
@@ -98,6 +98,7 @@ async def update_auction(
         setattr(auction, field, value)
     
     db.add(auction)
+    await auction_fees.publish(db, auction.id)
     await db.commit()
     await db.refresh(auction)
     return auction
@@ -107,7 +108,7 @@ async def delete_auction(
     *,
     db: AsyncSession = Depends(deps.get_db),
     id: int,
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Delete an auction.
@@ -118,5 +119,6 @@ async def delete_auction(
         raise HTTPException(status_code=404, detail="Auction not found")
     
     await db.delete(auction)
+    await auction_fees.publish(db, auction.id)
     await db.commit()
     return auction
@@ -1,56 +1,56 @@
+import asyncio
+import logging
+import time
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.api import deps
+from app.core.config import settings as app_settings
+from app.core.etag import weak_etag, is_fresh, not_modified, tag_response
 from app.models.company import CompanySettings
 from app.schemas.company import CompanySettingsCreate, CompanySettingsUpdate, CompanySettings as CompanySettingsSchema
-from app.models.user import User
+from app.services.company_service import CompanyService, LOGO_FIELDS
+from app.services.image_service import ImageService
+from app.services.storage_service import storage_service
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Logo field of each upload type
+LOGO_TYPES = {'bordereau': 'logo_bordereau', 'facture': 'logo_facture', 'decompte': 'logo_decompte', 'main': 'logo_url'}
 
 @router.get("/", response_model=CompanySettingsSchema)
 async def read_company_settings(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get company settings.
     """
-    result = await db.execute(select(CompanySettings))
-    settings = result.scalars().first()
+    settings = await CompanyService.get(db)
     if not settings:
-        # Return empty or default if not found, or raise 404. 
-        # For initialization, let's return a default object or 404.
         # Better to return 404 and handle in frontend or auto-create.
         raise HTTPException(status_code=404, detail="Company settings not found")
-    
-    # Generate presigned URLs for logos
-    # We create a copy or modify the object if it's not attached to session in a way that prevents it
-    # Pydantic model conversion happens after this return, so we can modify the ORM object attributes temporarily
-    # or better, convert to dict/schema and modify.
-    
-    # Since response_model is CompanySettingsSchema, we can return the ORM object, but if we modify it, 
-    # we should be careful. 
-    
-    # Let's use the storage service to get presigned URLs
-    if settings.logo_bordereau:
-        settings.logo_bordereau = storage_service.get_presigned_url(settings.logo_bordereau)
-    if settings.logo_facture:
-        settings.logo_facture = storage_service.get_presigned_url(settings.logo_facture)
-    if settings.logo_decompte:
-        settings.logo_decompte = storage_service.get_presigned_url(settings.logo_decompte)
-    if settings.logo_url:
-        settings.logo_url = storage_service.get_presigned_url(settings.logo_url)
-        
-    return settings
+
+    # The body carries presigned logo URLs, which are reused from the cache for up to
+    # (expiration - margin) seconds: changing the tag every `margin` seconds ensures a
+    # revalidated copy never holds an expired URL
+    etag = weak_etag("company", settings.version, int(time.time() // max(1, app_settings.STORAGE_PRESIGN_CACHE_MARGIN)))
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    tag_response(response, etag)
+
+    return CompanyService.presigned(settings)
 
 @router.put("/", response_model=CompanySettingsSchema)
 async def update_company_settings(
     *,
     db: AsyncSession = Depends(deps.get_db),
     settings_in: CompanySettingsUpdate,
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Update company settings (Admin only).
@@ -61,7 +61,8 @@ async def update_company_settings(
     # Helper to extract key from potential presigned URL
     def extract_key(url: str) -> str:
         if not url: return url
-        if "r2.cloudflarestorage.com" in url or "r2.dev" in url:
+        # R2 URLs, or signed URLs of the local storage backend (/storage/<key>)
+        if "r2.cloudflarestorage.com" in url or "r2.dev" in url or "/storage/" in url:
             # It's likely a full URL.
             # If it has query params (presigned), strip them.
             if "?" in url:
@@ -74,13 +75,14 @@ async def update_company_settings(
             # Let's assume the path after the bucket name or domain is the key.
             # Our keys start with "logos/..."
             if "/logos/" in url:
-                return "logos/" + url.split("/logos/")[1]
+                # Displayed URLs point to the web variant: store the uploaded file's key
+                return ImageService.original_key("logos/" + url.split("/logos/")[1])
         return url
 
     if not settings:
         # Sanitize inputs
         data = settings_in.dict()
-        for field in ['logo_url', 'logo_bordereau', 'logo_facture', 'logo_decompte']:
+        for field in LOGO_FIELDS:
             if field in data and data[field]:
                 data[field] = extract_key(data[field])
                 
@@ -88,60 +90,72 @@ async def update_company_settings(
         db.add(settings)
     else:
         for field, value in settings_in.dict(exclude_unset=True).items():
-            if field in ['logo_url', 'logo_bordereau', 'logo_facture', 'logo_decompte'] and value:
+            if field in LOGO_FIELDS and value:
                 value = extract_key(value)
             setattr(settings, field, value)
-            
+
+    await CompanyService.changed(db)
     await db.commit()
     await db.refresh(settings)
     
     # Return with presigned URLs for immediate display update
-    if settings.logo_bordereau:
-        settings.logo_bordereau = storage_service.get_presigned_url(settings.logo_bordereau)
-    if settings.logo_facture:
-        settings.logo_facture = storage_service.get_presigned_url(settings.logo_facture)
-    if settings.logo_decompte:
-        settings.logo_decompte = storage_service.get_presigned_url(settings.logo_decompte)
-    if settings.logo_url:
-        settings.logo_url = storage_service.get_presigned_url(settings.logo_url)
-
-    return settings
-
-from fastapi import UploadFile, File, Form
-from app.services.storage_service import storage_service
+    return CompanyService.presigned(CompanyService.snapshot(settings))
 
 @router.post("/upload-logo")
 async def upload_logo(
     file: UploadFile = File(...),
     type: str = Form(...), # bordereau, facture, decompte, main
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
-    Upload a logo file and return its URL. Deletes the old logo if it exists.
+    Upload a logo file and return its URL. It replaces the logo of this type in the
+    settings, and the old logo is deleted once nothing refers to it anymore.
+    PDF and web variants are generated and stored next to the uploaded file.
     """
-    # 1. Fetch current settings to find old logo
+    # Variants are generated first: a file that is not a readable image is rejected
+    # before the current logo is touched
+    content = await file.read()
+    try:
+        variants = await asyncio.to_thread(ImageService.make_logo_variants, content)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Unsupported image format")
+    await file.seek(0)
+
+    # 1. Upload the new logo (returns key) and its variants; the current one stays in
+    # place until they are all stored
+    key = None
+    try:
+        key = await storage_service.upload_file(file, folder=f"logos/{type}")
+        await ImageService.store_logo_variants(key, variants)
+    except Exception:
+        logger.exception("Failed to store logo %s", key or file.filename)
+        if key and await storage_service.delete_files(ImageService.logo_keys(key)):
+            logger.warning("Could not delete the partial upload of logo %s", key)
+        raise HTTPException(status_code=500, detail="Failed to store the logo")
+
+    # 2. Switch the settings to the new logo
+    old_key = None
+    field = LOGO_TYPES.get(type)
     result = await db.execute(select(CompanySettings))
     settings = result.scalars().first()
+    if settings and field:
+        old_key = getattr(settings, field)
+        setattr(settings, field, key)
+        # Cached copies of the settings point to the old files
+        await CompanyService.changed(db)
+        await db.commit()
 
-    if settings:
-        old_url = None
-        if type == 'bordereau':
-            old_url = settings.logo_bordereau
-        elif type == 'facture':
-            old_url = settings.logo_facture
-        elif type == 'decompte':
-            old_url = settings.logo_decompte
-        elif type == 'main':
-            old_url = settings.logo_url
-        
-        if old_url:
-            storage_service.delete_file(old_url)
-
-    # 2. Upload new logo (returns key)
-    key = await storage_service.upload_file(file, folder=f"logos/{type}")
+    # 3. Only then delete the old files; a failure leaves orphans, not a broken logo
+    if old_key and ImageService.original_key(old_key) != key:
+        try:
+            failed = await storage_service.delete_files(ImageService.logo_keys(old_key))
+            if failed:
+                logger.warning("Could not delete old logo files %s", failed)
+        except Exception:
+            logger.exception("Failed to delete old logo %s", old_key)
     
     # Generate presigned URL for immediate display
-    url = storage_service.get_presigned_url(key)
+    url = storage_service.get_presigned_url(ImageService.variant_key(key, "web"))
     
     return {"url": url}
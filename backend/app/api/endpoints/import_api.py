@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
+from app.core.tracing import traced
 from app.services.import_service import ImportService
-from app.models.user import User
 
 router = APIRouter()
 
 @router.post("/mapping/{auction_id}")
+@traced("import.mapping", "auction_id")
 async def import_mapping(
     auction_id: int,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ):
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel file.")
@@ -1,51 +1,62 @@
-import os
+import logging
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
 from app.api import deps
+from app.core.etag import weak_etag, is_fresh, not_modified, tag_response
+from app.core.serialization import ORJSONResponse, rows_to_dicts
+from app.core.tracing import traced, child_span, current_span
 from app.models.invoice import Invoice, InvoiceStatus
 from app.models.lot import Lot, LotStatus
 from app.models.auction import Auction
+from app.schemas.invoice import InvoicePage
 from app.services.vat_service import VATService
 from app.services.compliance_service import ComplianceService
 from app.services.facturx_service import FacturXService
+from app.services.archive_service import ArchiveService
+from app.services.auction_service import AuctionService
+from app.services.company_service import CompanyService
+from app.services.image_service import ImageService
+from app.services.storage_service import storage_service
+from app.services.version_service import VersionService
 
 router = APIRouter()
-
-INVOICE_DIR = os.path.abspath("invoices") # Local path
-if not os.path.exists(INVOICE_DIR):
-    os.makedirs(INVOICE_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
 
 @router.post("/{auction_id}/generate")
+@traced("invoices.generate", "auction_id")
 async def generate_invoices(
     auction_id: int,
     db: AsyncSession = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user),
 ):
-    # 1. Get Auction
-    auction = await db.get(Auction, auction_id)
-    if not auction:
+    # 1. Get Auction fee rates
+    fees = await AuctionService.fees(db, auction_id)
+    if not fees:
         raise HTTPException(status_code=404, detail="Auction not found")
         
     # 2. Get SOLD Lots without Invoice
     # We group by Buyer to create one invoice per buyer?
     # Yes, usually one invoice per buyer for the auction.
     
-    result = await db.execute(
-        select(Lot).where(
-            Lot.auction_id == auction_id, 
-            Lot.status == LotStatus.SOLD,
-            # Lot.invoice_id == None # We haven't added invoice_id to Lot yet, let's assume we query lots and check if they are already invoiced via some other way or just re-generate?
-            # For simplicity, let's assume we generate for all sold lots and if we want to avoid duplicates we should check.
-            # But wait, Lot doesn't have invoice_id FK yet.
-            # We should probably add it or just link Invoice -> Lots (Invoice has many Lots).
-            # Invoice model has buyer_id and auction_id.
-            # We can query Invoices for this auction and buyer.
+    with child_span("invoices.load_lots") as span:
+        result = await db.execute(
+            select(Lot).where(
+                Lot.auction_id == auction_id, 
+                Lot.status == LotStatus.SOLD,
+                # Lot.invoice_id == None # We haven't added invoice_id to Lot yet, let's assume we query lots and check if they are already invoiced via some other way or just re-generate?
+                # For simplicity, let's assume we generate for all sold lots and if we want to avoid duplicates we should check.
+                # But wait, Lot doesn't have invoice_id FK yet.
+                # We should probably add it or just link Invoice -> Lots (Invoice has many Lots).
+                # Invoice model has buyer_id and auction_id.
+                # We can query Invoices for this auction and buyer.
+            )
         )
-    )
-    lots = result.scalars().all()
+        lots = result.scalars().all()
+        span.set_attribute("lots", len(lots))
     
     if not lots:
         raise HTTPException(status_code=400, detail="No sold lots found to invoice")
@@ -60,12 +71,17 @@ async def generate_invoices(
         lots_by_buyer[lot.buyer_id].append(lot)
         
     generated_count = 0
+    stored = [] # PDF keys written by this run
     
     # Get last invoice hash for chaining
     # We need to order by ID desc
     last_invoice_result = await db.execute(select(Invoice).order_by(Invoice.id.desc()).limit(1))
     last_invoice = last_invoice_result.scalars().first()
-    previous_hash = last_invoice.hash if last_invoice else "GENESIS_HASH"
+    previous_hash = last_invoice.hash if last_invoice else ComplianceService.GENESIS_HASH
+
+    # Loaded once for the whole run (and cached by the process across runs)
+    company = await CompanyService.get(db)
+    logo = await ImageService.pdf_logo(company.logo_facture if company else None)
     
     for buyer_id, buyer_lots in lots_by_buyer.items():
         # Check if invoice already exists for this buyer/auction?
@@ -78,7 +94,7 @@ async def generate_invoices(
         total_incl = 0.0
         
         for lot in buyer_lots:
-            vat_details = VATService.calculate_lines(lot, auction.buyer_fee_rate, auction.platform_fee_rate)
+            vat_details = VATService.calculate_lines(lot, fees.buyer_fee_rate, fees.platform_fee_rate)
             
             # Lot Line
             lines.append({
@@ -135,7 +151,8 @@ async def generate_invoices(
         previous_hash = invoice.hash # Update for next iteration
         
         db.add(invoice)
-        await db.flush() # Get ID
+        with child_span("db.flush"):
+            await db.flush() # Get ID
         
         # Generate PDF/Factur-X
         # We need to fetch buyer to get name/address for PDF
@@ -144,30 +161,131 @@ async def generate_invoices(
         # Let's rely on lazy loading or eager load in query.
         # We didn't eager load buyer in lots query.
         # We can fetch buyer separately or rely on relationship access (might trigger query).
-        await db.refresh(invoice, attribute_names=['buyer'])
+        with child_span("invoices.load_buyer"):
+            await db.refresh(invoice, attribute_names=['buyer'])
         
         try:
-            pdf_path, xml_content = FacturXService.create_facturx_pdf(invoice, lines, INVOICE_DIR)
-            invoice.pdf_path = pdf_path
+            pdf_content, xml_content = FacturXService.create_facturx_pdf(invoice, lines, logo, company)
+            invoice.pdf_path = await storage_service.upload_stream(
+                pdf_content,
+                f"invoices/{auction_id}/invoice_{invoice.number}.pdf",
+                content_type="application/pdf",
+            )
+            stored.append(invoice.pdf_path)
             invoice.xml_content = xml_content
-        except Exception as e:
-            print(f"Error generating PDF for invoice {invoice.id}: {e}")
-            # Continue but maybe mark as error?
+        except Exception:
+            # A signed invoice must have its document: nothing of this run is kept
+            logger.exception("Error generating PDF for invoice %s", number)
+            await db.rollback()
+            if stored and await storage_service.delete_files(stored):
+                logger.warning("Could not delete the PDFs of the failed invoice run of auction %s", auction_id)
+            raise HTTPException(status_code=500, detail=f"Failed to generate the PDF of invoice {number}")
         
         generated_count += 1
-        
-    await db.commit()
+
+    await VersionService.bump_auctions(db, auction_id)
+    with child_span("db.commit"):
+        await db.commit()
+    current_span().set_attribute("invoices", generated_count)
     
     return {"message": f"Generated {generated_count} invoices"}
 
-@router.get("/{auction_id}/list")
+@router.post("/verify")
+async def verify_invoice_chain(
+    full: bool = False,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_admin_user),
+):
+    """
+    Audits the invoice hash chain, resuming from the last checkpoint unless `full` is set.
+    """
+    report = await ComplianceService.verify_chain(db, resume=not full)
+    await db.commit()
+    return report
+
+@router.get("/{auction_id}/list", response_model=InvoicePage)
 async def list_invoices(
     auction_id: int,
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_user),
+):
+    version = await VersionService.auction_version(db, auction_id)
+    etag = weak_etag("auction", auction_id, version) if version is not None else None
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    total_result = await db.execute(
+        select(func.count(Invoice.id)).where(Invoice.auction_id == auction_id)
+    )
+    # Summary columns only (never the Factur-X payloads), serialized straight from the rows
+    result = await db.execute(
+        select(
+            Invoice.id, Invoice.number, Invoice.buyer_id, Invoice.auction_id,
+            Invoice.total_excl, Invoice.total_vat, Invoice.total_incl,
+            Invoice.status, Invoice.signature_date, Invoice.hash,
+        )
+        .where(Invoice.auction_id == auction_id)
+        .order_by(Invoice.number)
+        .offset(skip)
+        .limit(limit)
+    )
+    return tag_response(ORJSONResponse({
+        "items": rows_to_dicts(result),
+        "total": total_result.scalar() or 0,
+        "skip": skip,
+        "limit": limit,
+    }), etag)
+
+@router.get("/{auction_id}/{invoice_id}/xml")
+async def download_invoice_xml(
+    auction_id: int,
+    invoice_id: int,
     db: AsyncSession = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user),
 ):
     result = await db.execute(
-        select(Invoice).where(Invoice.auction_id == auction_id).order_by(Invoice.number)
+        select(Invoice.number, Invoice.xml_content)
+        .where(Invoice.id == invoice_id, Invoice.auction_id == auction_id)
+    )
+    invoice = result.first()
+    if not invoice or not invoice.xml_content:
+        raise HTTPException(status_code=404, detail="Invoice XML not found")
+
+    return Response(
+        content=invoice.xml_content,
+        media_type="application/xml",
+        headers={"Content-Disposition": f"attachment; filename=facturx_{invoice.number}.xml"}
+    )
+
+@router.get("/{auction_id}/archive")
+async def download_invoice_archive(
+    auction_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_user),
+):
+    """
+    Streams a ZIP of every invoice PDF of the auction, built on the fly.
+    """
+    auction = await db.get(Auction, auction_id)
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+
+    # Only the document references are loaded; the PDFs are read while streaming
+    result = await db.execute(
+        select(Invoice.number, Invoice.pdf_path, Invoice.signature_date)
+        .where(Invoice.auction_id == auction_id, Invoice.pdf_path.isnot(None))
+        .order_by(Invoice.number)
+    )
+    invoices = result.all()
+    if not invoices:
+        raise HTTPException(status_code=404, detail="No invoice documents found")
+
+    filename = f"factures_vente_{auction.number or auction_id}.zip"
+    return StreamingResponse(
+        ArchiveService.stream_invoice_archive(invoices),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
-    invoices = result.scalars().all()
-    return invoices
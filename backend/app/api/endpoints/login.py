@@ -33,7 +33,7 @@ async def login_access_token(
         if form_data.username == "admin@auctify.com" and form_data.password == "admin":
             user = User(
                 email="admin@auctify.com", 
-                hashed_password=security.get_password_hash("admin"),
+                hashed_password=await security.hash_password("admin"),
                 full_name="Admin User",
                 role=UserRole.ADMIN
             )
@@ -43,7 +43,7 @@ async def login_access_token(
         elif form_data.username == "clerk@auctify.com" and form_data.password == "clerk":
             user = User(
                 email="clerk@auctify.com", 
-                hashed_password=security.get_password_hash("clerk"),
+                hashed_password=await security.hash_password("clerk"),
                 full_name="Clerk User",
                 role=UserRole.CLERK
             )
@@ -52,8 +52,15 @@ async def login_access_token(
             await db.refresh(user)
         else:
             raise HTTPException(status_code=400, detail="Incorrect email or password")
-    elif not security.verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    else:
+        # bcrypt runs on the hashing pool, off the event loop
+        valid, new_hash = await security.verify_and_update(form_data.password, user.hashed_password)
+        if not valid:
+            raise HTTPException(status_code=400, detail="Incorrect email or password")
+        if new_hash:
+            # BCRYPT_ROUNDS changed since this hash was made
+            user.hashed_password = new_hash
+            await db.commit()
         
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
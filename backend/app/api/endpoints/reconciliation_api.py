@@ -1,20 +1,24 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
 from app.api import deps
+from app.core.etag import weak_etag, is_fresh, not_modified, tag_response
+from app.core.serialization import ORJSONResponse
+from app.core.tracing import traced
 from app.services.reconciliation_service import ReconciliationService
-from app.models.user import User
+from app.services.version_service import VersionService
 from app.models.lot import Lot, LotStatus
 
 router = APIRouter()
 
 @router.post("/{auction_id}/import")
+@traced("reconciliation.import", "auction_id")
 async def reconcile_import(
     auction_id: int,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file format. Please upload a CSV file.")
@@ -28,9 +32,17 @@ async def reconcile_import(
 @router.get("/{auction_id}/stats")
 async def get_reconciliation_stats(
     auction_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ):
+    version = await VersionService.auction_version(db, auction_id)
+    etag = weak_etag("auction", auction_id, version) if version is not None else None
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    tag_response(response, etag)
+
     # Count lots by status
     result = await db.execute(
         select(Lot.status, func.count(Lot.id))
@@ -43,21 +55,29 @@ async def get_reconciliation_stats(
 @router.get("/{auction_id}/results")
 async def get_reconciliation_results(
     auction_id: int,
+    request: Request,
     status: str = None,
     seller_name: str = None,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ):
+    # Filters are part of the URL, which caches already key on: the version is enough
+    version = await VersionService.auction_version(db, auction_id)
+    etag = weak_etag("auction", auction_id, version) if version is not None else None
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
     results = await ReconciliationService.get_results(db, auction_id, status, seller_name)
-    return results
+    return tag_response(ORJSONResponse(results), etag)
 
 @router.get("/{auction_id}/export")
+@traced("reconciliation.export", "auction_id")
 async def export_reconciliation_results(
     auction_id: int,
     status: str = None,
     seller_name: str = None,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ):
     from fastapi.responses import StreamingResponse
     
@@ -1,120 +1,202 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import zlib
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func
+from sqlalchemy.orm import undefer
 from app.api import deps
-from app.models.settlement import Settlement, SettlementStatus
-from app.models.lot import Lot, LotStatus
+from app.core.serialization import ORJSONResponse, rows_to_dicts
+from app.core.tracing import traced
+from app.models.settlement import Settlement
+from app.models.settlement_batch import SettlementBatch
 from app.models.auction import Auction
 from app.models.actor import Actor
-from app.services.sepa_service import SEPAService
+from app.schemas.settlement import SettlementPage, SettlementBatchSummary, ConsolidatedSettlementRequest
+from app.services.settlement_service import SettlementService
+from app.services.storage_service import storage_service
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.post("/{auction_id}/generate")
+@traced("settlements.generate", "auction_id")
 async def generate_settlements(
     auction_id: int,
     db: AsyncSession = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user),
 ):
-    # 1. Get Auction
-    auction = await db.get(Auction, auction_id)
-    if not auction:
-        raise HTTPException(status_code=404, detail="Auction not found")
-        
-    # 2. Get SOLD Lots
-    result = await db.execute(
-        select(Lot)
-        .options(selectinload(Lot.seller))
-        .where(
-            Lot.auction_id == auction_id, 
-            Lot.status == LotStatus.SOLD,
-            Lot.seller_id.isnot(None)
+    # Totals, fees and bank details are aggregated per seller by the database
+    result = await SettlementService.generate_for_auction(db, auction_id)
+    if result is None:
+        auction = await db.get(Auction, auction_id)
+        if not auction:
+            raise HTTPException(status_code=404, detail="Auction not found")
+        raise HTTPException(status_code=400, detail="No unsettled sold lots found to settle")
+
+    if "errors" in result:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Invalid bank details", "errors": result["errors"]},
         )
+
+    batches = result["batches"]
+    return {
+        "message": f"Generated {result['settlements']} settlements",
+        "batch_ids": [batch.id for batch in batches],
+    }
+
+@router.post("/consolidated")
+@traced("settlements.consolidated")
+async def generate_consolidated_settlements(
+    run_in: ConsolidatedSettlementRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_user),
+):
+    """
+    Settles every seller once across a list of auctions or a date range,
+    with the per-auction breakdown in the remittance information.
+    """
+    if not run_in.auction_ids and not (run_in.date_from and run_in.date_to):
+        raise HTTPException(status_code=400, detail="Provide auction_ids or a date_from/date_to range")
+
+    result = await SettlementService.generate_consolidated(
+        db, run_in.auction_ids, run_in.date_from, run_in.date_to
     )
-    lots = result.scalars().all()
-    
-    if not lots:
-        raise HTTPException(status_code=400, detail="No sold lots found to settle")
-
-    # Group by Seller
-    lots_by_seller = {}
-    for lot in lots:
-        if lot.seller_id not in lots_by_seller:
-            lots_by_seller[lot.seller_id] = []
-        lots_by_seller[lot.seller_id].append(lot)
-        
-    generated_count = 0
-    new_settlements = []
-    
-    for seller_id, seller_lots in lots_by_seller.items():
-        # Calculate Total Amount Due
-        # Amount = Hammer Price - Seller Fees (if any)
-        # For now, let's assume Seller Fees are 0 or handled elsewhere, 
-        # or we just pay the Hammer Price minus commission?
-        # The prompt didn't specify Seller Fees, only Buyer Fees.
-        # Let's assume we pay the full Hammer Price for now, or maybe deduct a standard seller commission?
-        # Let's assume 10% seller commission for realism, or 0 if not specified.
-        # I'll stick to 0 for simplicity unless specified.
-        
-        total_amount = sum(lot.hammer_price or 0 for lot in seller_lots)
-        
-        # Create Settlement
-        settlement = Settlement(
-            auction_id=auction_id,
-            seller_id=seller_id,
-            amount=total_amount,
-            status=SettlementStatus.CREATED
+    if result is None:
+        raise HTTPException(status_code=400, detail="No unsettled sold lots found to settle")
+
+    if "errors" in result:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Invalid bank details", "errors": result["errors"]},
         )
-        db.add(settlement)
-        new_settlements.append(settlement)
-        generated_count += 1
-    
-    await db.flush()
-    
-    # Generate SEPA XML for all new settlements
-    # We need to reload settlements with relationships to generate XML
-    # Or just use the objects we have (we need seller info which is in lots[0].seller)
-    # But we didn't attach seller to settlement object yet (it's in session).
-    # Let's fetch them properly or assume we can access via relationship if loaded.
-    
-    # To be safe, let's generate one global XML for the batch?
-    # Or one XML per settlement? Usually one XML file containing multiple transactions.
-    # Let's generate one XML for this generation run.
-    
-    # We need to populate the `seller` relationship on the settlement objects
-    for s in new_settlements:
-        # Find seller from lots
-        s.seller = lots_by_seller[s.seller_id][0].seller
-        s.auction = auction
-        
-    xml_content = SEPAService.generate_sepa_xml(new_settlements)
-    
-    # Store XML in each settlement? Or just one?
-    # Usually we store the file and link it.
-    # For now, let's store the content in each settlement for simplicity, or just the first one?
-    # Or maybe we need a "SettlementBatch" model?
-    # Given the constraints, I'll store the same XML content in all settlements of this batch, 
-    # or just return it to the user.
-    # The requirement says "Download SEPA XML".
-    # I'll store it in the first settlement or all.
-    for s in new_settlements:
-        s.xml_content = xml_content
-        
-    await db.commit()
-    
-    return {"message": f"Generated {generated_count} settlements", "xml_content": xml_content}
-
-@router.get("/{auction_id}/list")
+
+    batches = result["batches"]
+    return {
+        "message": f"Generated {result['settlements']} settlements for {result['sellers']} sellers across {result['auctions']} auctions",
+        "batch_ids": [batch.id for batch in batches],
+    }
+
+def gunzip(chunks):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    yield decompressor.flush()
+
+async def batch_xml_response(request: Request, batch: SettlementBatch) -> Response:
+    """
+    Serves a SEPA file from storage, or from the row for batches stored before.
+    Clients accepting gzip get the stored bytes as-is.
+    """
+    if batch.storage_key:
+        try:
+            chunks = await storage_service.get_stream(batch.storage_key)
+        except Exception:
+            logger.exception("Cannot read settlement batch %s from %s", batch.id, batch.storage_key)
+            raise HTTPException(status_code=404, detail="Settlement file not found in storage")
+    else:
+        chunks = [batch.xml_gz]
+
+    headers = {
+        "Content-Disposition": f"attachment; filename=SEPA_PAIN001_{batch.message_id}.xml",
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(chunks, media_type="application/xml", headers=headers)
+
+    return StreamingResponse(gunzip(chunks), media_type="application/xml", headers=headers)
+
+@router.get("/batches", response_model=List[SettlementBatchSummary])
+async def list_settlement_batches(
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_user),
+):
+    # xml_gz is deferred on the model: this is an index scan on created_at
+    result = await db.execute(
+        select(SettlementBatch)
+        .order_by(SettlementBatch.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+@router.get("/batches/{batch_id}/xml")
+async def download_settlement_batch(
+    batch_id: int,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_user),
+):
+    result = await db.execute(
+        select(SettlementBatch)
+        .options(undefer(SettlementBatch.xml_gz))
+        .where(SettlementBatch.id == batch_id)
+    )
+    batch = result.scalars().first()
+    if not batch or not (batch.storage_key or batch.xml_gz):
+        raise HTTPException(status_code=404, detail="Settlement batch not found")
+    return await batch_xml_response(request, batch)
+
+@router.get("/{auction_id}/list", response_model=SettlementPage)
 async def list_settlements(
     auction_id: int,
+    skip: int = 0,
+    limit: int = 100,
     db: AsyncSession = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user),
 ):
+    total_result = await db.execute(
+        select(func.count(Settlement.id)).where(Settlement.auction_id == auction_id)
+    )
+    # Only summary columns: the SEPA file lives in SettlementBatch
     result = await db.execute(
-        select(Settlement)
-        .options(selectinload(Settlement.seller))
+        select(
+            Settlement.id, Settlement.auction_id, Settlement.seller_id,
+            Settlement.hammer_total, Settlement.seller_fees, Settlement.seller_fees_vat,
+            Settlement.amount, Settlement.status, Settlement.batch_id, Settlement.created_at,
+            Actor.name.label("seller_name"), Actor.iban.label("seller_iban"),
+        )
+        .join(Actor, Actor.id == Settlement.seller_id)
         .where(Settlement.auction_id == auction_id)
+        .order_by(Settlement.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    items = []
+    for row in rows_to_dicts(result):
+        row["seller"] = {"id": row["seller_id"], "name": row.pop("seller_name"), "iban": row.pop("seller_iban")}
+        items.append(row)
+
+    return ORJSONResponse({
+        "items": items,
+        "total": total_result.scalar() or 0,
+        "skip": skip,
+        "limit": limit,
+    })
+
+@router.get("/{auction_id}/{settlement_id}/xml")
+async def download_settlement_xml(
+    auction_id: int,
+    settlement_id: int,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_user),
+):
+    result = await db.execute(
+        select(SettlementBatch)
+        .options(undefer(SettlementBatch.xml_gz))
+        .join(Settlement, Settlement.batch_id == SettlementBatch.id)
+        .where(Settlement.id == settlement_id, Settlement.auction_id == auction_id)
     )
-    settlements = result.scalars().all()
-    return settlements
+    batch = result.scalars().first()
+    if not batch or not (batch.storage_key or batch.xml_gz):
+        raise HTTPException(status_code=404, detail="Settlement XML not found")
+    return await batch_xml_response(request, batch)
@@ -0,0 +1,30 @@
+import mimetypes
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.services.storage_backends import LocalStorageBackend
+from app.services.storage_service import storage_service
+
+router = APIRouter()
+
+@router.get("/{key:path}")
+async def read_stored_file(key: str, expires: int, signature: str):
+    """
+    Serves a file of the local storage backend through a signed URL (see LocalStorageBackend.presign).
+    No session is required: the signature grants access to this key until `expires`.
+    """
+    backend = storage_service.backend
+    if not isinstance(backend, LocalStorageBackend):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not backend.verify(key, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+
+    try:
+        path = backend.path(key)
+    except ValueError:
+        path = None
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    media_type, _ = mimetypes.guess_type(key)
+    return FileResponse(path, media_type=media_type or "application/octet-stream")
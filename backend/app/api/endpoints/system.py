@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from app.api import deps
+from app.core.tracing import recent_traces
+from app.db.session import pool_status
+
+router = APIRouter()
+
+@router.get("/db-pool")
+async def read_db_pool(
+    current_user = Depends(deps.get_current_admin_user),
+):
+    """
+    Database pool utilization and checkout wait times of this worker process.
+    """
+    return pool_status()
+
+@router.get("/traces")
+async def read_traces(
+    limit: int = 20,
+    spans: bool = False,
+    current_user = Depends(deps.get_current_admin_user),
+):
+    """
+    Last pipeline traces of this worker process, newest first, with per-stage timings.
+    Set `spans` to include every recorded span.
+    """
+    return recent_traces(limit, include_spans=spans)
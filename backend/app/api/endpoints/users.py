@@ -11,7 +11,7 @@ from app.api import deps
 from app.core.config import settings
 from app.models.user import User, UserRole
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
-from app.core.security import get_password_hash
+from app.core.security import hash_password
 
 router = APIRouter()
 
@@ -20,7 +20,7 @@ async def read_users(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Retrieve users.
@@ -36,7 +36,7 @@ async def create_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     user_in: UserCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Create new user.
@@ -54,7 +54,7 @@ async def create_user(
     
     obj_in_data = jsonable_encoder(user_in)
     del obj_in_data["password"]
-    db_obj = User(**obj_in_data, hashed_password=get_password_hash(user_in.password))
+    db_obj = User(**obj_in_data, hashed_password=await hash_password(user_in.password))
     db.add(db_obj)
     await db.commit()
     await db.refresh(db_obj)
@@ -66,7 +66,7 @@ async def update_user(
     db: AsyncSession = Depends(deps.get_db),
     user_id: int,
     user_in: UserUpdate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Update a user.
@@ -89,7 +89,7 @@ async def update_user(
         update_data = user_in.dict(exclude_unset=True)
         
     if "password" in update_data and update_data["password"]:
-        hashed_password = get_password_hash(update_data["password"])
+        hashed_password = await hash_password(update_data["password"])
         del update_data["password"]
         update_data["hashed_password"] = hashed_password
         
@@ -98,6 +98,8 @@ async def update_user(
             setattr(user, field, update_data[field])
             
     db.add(user)
+    # Role or is_active may have changed: drop the cached snapshot in every worker
+    await deps.current_users.publish(db, user.id)
     await db.commit()
     await db.refresh(user)
     return user
@@ -107,7 +109,7 @@ async def delete_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     user_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
 ) -> Any:
     """
     Delete a user.
@@ -124,5 +126,6 @@ async def delete_user(
         )
     
     await db.delete(user)
+    await deps.current_users.publish(db, user.id)
     await db.commit()
     return user
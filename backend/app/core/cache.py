@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time-to-live.
+    Expired entries are dropped lazily, when read or pushed out by the LRU bound.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class InvalidationBus:
+    """
+    Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+    Caches subscribe a handler per namespace. Writers call publish() inside their
+    transaction: local handlers run at once, and every other worker receives the
+    notification when the transaction commits (NOTIFY is transactional).
+    While the listener connection is down, notifications are missed, so every
+    handler is called with key None (clear all) when it reconnects.
+    """
+    CHANNEL = "cache_invalidation"
+    RECONNECT_DELAY = 5.0
+
+    def __init__(self):
+        self._handlers: dict[str, list[Callable[[Optional[str]], None]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, namespace: str, handler: Callable[[Optional[str]], None]):
+        self._handlers.setdefault(namespace, []).append(handler)
+
+    def _dispatch(self, namespace: Optional[str], key: Optional[str]):
+        namespaces = [namespace] if namespace else list(self._handlers)
+        for name in namespaces:
+            for handler in self._handlers.get(name, []):
+                try:
+                    handler(key)
+                except Exception:
+                    logger.exception("Cache invalidation handler failed for %s", name)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        self._dispatch(message.get("ns"), message.get("key"))
+
+    async def publish(self, db, namespace: str, key: Hashable = None):
+        """
+        Invalidates `key` (or the whole namespace when None) here, and in the other
+        workers once `db`'s transaction commits.
+        """
+        key = None if key is None else str(key)
+        self._dispatch(namespace, key)
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": self.CHANNEL, "payload": json.dumps({"ns": namespace, "key": key})},
+        )
+
+    async def _listen(self):
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.CHANNEL, self._on_notify)
+                # Anything may have changed while we were not listening
+                self._dispatch(None, None)
+                await closed.wait()
+                logger.warning("Cache invalidation listener disconnected")
+            except asyncio.CancelledError:
+                if connection and not connection.is_closed():
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation listener unavailable: %s", e)
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+invalidation_bus = InvalidationBus()
+
+class SharedCache(TTLCache):
+    """
+    TTLCache of one namespace of the invalidation bus: writers publish() in their
+    transaction and the entry is dropped in every worker. Keys come back from
+    NOTIFY as strings and are converted with `key_type`.
+    """
+    def __init__(self, namespace: str, maxsize: int = 1024, ttl: float = 300.0, key_type: Callable[[str], Hashable] = str):
+        super().__init__(maxsize, ttl)
+        self.namespace = namespace
+        self.key_type = key_type
+        # Bumped by every invalidation: a value loaded before it is not stored
+        self._generation = 0
+        invalidation_bus.subscribe(namespace, self._on_invalidate)
+
+    def _on_invalidate(self, key: Optional[str]):
+        self._generation += 1
+        if key is None:
+            self.clear()
+        else:
+            self.invalidate(self.key_type(key))
+
+    async def publish(self, db, key: Hashable = None):
+        await invalidation_bus.publish(db, self.namespace, key)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Read-through: returns the cached value or awaits `loader()` and caches its
+        result, unless it is None or an invalidation arrived while loading.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = await loader()
+        if value is not None and generation == self._generation:
+            self.set(key, value)
+        return value
@@ -0,0 +1,112 @@
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            # "gzip;q=0" explicitly refuses it
+            quality = params.strip().lower()
+            try:
+                return not (quality.startswith("q=") and float(quality[2:]) == 0)
+            except ValueError:
+                return True
+    return False
+
+class CompressionMiddleware:
+    """
+    Gzips response bodies for clients that accept it, as they are sent: streamed
+    responses (exports, downloads) are compressed chunk by chunk, never buffered.
+    Small bodies, already encoded responses (e.g. the stored gzip of a SEPA file)
+    and already compressed types are passed through untouched.
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        level: Optional[int] = None,
+        excluded_types: Optional[list[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else settings.COMPRESSION_MINIMUM_SIZE
+        self.level = level if level is not None else settings.COMPRESSION_LEVEL
+        self.excluded_types = tuple(excluded_types if excluded_types is not None else settings.COMPRESSION_EXCLUDED_TYPES)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not accepts_gzip(Headers(scope=scope).get("accept-encoding", "")):
+            await self.app(scope, receive, send)
+            return
+        await GzipResponder(self, send).run(scope, receive)
+
+class GzipResponder:
+    def __init__(self, middleware: CompressionMiddleware, send: Send):
+        self.middleware = middleware
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor = None # Set once the response is known to be compressed
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.send_wrapper)
+
+    def _compressible(self, headers: Headers) -> bool:
+        if self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not content_type.startswith(self.middleware.excluded_types)
+
+    def _encode_headers(self, headers: MutableHeaders):
+        headers["Content-Encoding"] = "gzip"
+        headers.add_vary_header("Accept-Encoding")
+        # The compressed bytes differ from the identity ones: only a weak tag still holds
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def send_wrapper(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held until the first body chunk tells us whether to compress
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=list(self.start["headers"]))
+            self.start["headers"] = headers.raw
+            length = headers.get("content-length")
+            small = len(body) < self.middleware.minimum_size if not more_body else (
+                length is not None and int(length) < self.middleware.minimum_size
+            )
+            if small or not self._compressible(headers):
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+
+            self.compressor = zlib.compressobj(self.middleware.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._encode_headers(headers)
+            if not more_body:
+                # Whole body at once: the compressed length is known
+                data = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(data))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            del headers["Content-Length"]
+            await self.send(self.start)
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.flush()
+        elif not data:
+            # zlib is still filling its window: nothing to send yet
+            return
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
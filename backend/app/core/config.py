@@ -6,8 +6,21 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     
     DATABASE_URL: str
+    DB_ECHO: bool = False # Logs every statement: development only
+    DB_POOL_SIZE: int = 10 # Connections kept open per worker process
+    DB_MAX_OVERFLOW: int = 10 # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT: float = 30.0 # Seconds to wait for a connection before failing the request
+    DB_POOL_RECYCLE: int = 1800 # Reopen connections older than this (seconds), -1 to disable
+    DB_POOL_PRE_PING: bool = True
+    DB_SLOW_QUERY_MS: float = 200.0 # Statements slower than this are logged with their endpoint, 0 to disable
+    DB_STATEMENT_CACHE_SIZE: int = 100 # Prepared statements cached per connection; 0 behind PgBouncer (transaction mode)
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    BCRYPT_ROUNDS: int = 12 # Existing hashes are upgraded at their next login when this changes
+    PASSWORD_HASH_WORKERS: int = 2 # Threads hashing passwords, per worker process
+    PASSWORD_HASH_MAX_PENDING: int = 32 # Logins beyond this get a 503 instead of queueing
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: float = 60.0 # Bounds staleness if an invalidation is ever missed
     BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:5173", "http://localhost:3000", "http://127.0.0.1:5173", "http://127.0.0.1:3000"]
 
     # R2 Storage
@@ -18,6 +31,53 @@ class Settings(BaseSettings):
     R2_REGION: str = "auto"
     R2_ENDPOINT: str = "https://022e575b16ec102a7b0a22626a0987f2.r2.cloudflarestorage.com"
     R2_PUBLIC_BASE: str = "https://pub-022e575b16ec102a7b0a22626a0987f2.r2.dev"
+    STORAGE_BACKEND: str = "s3" # "s3" (R2) or "local"
+    LOCAL_STORAGE_DIR: str = "storage"
+    LEGACY_INVOICE_DIR: str = "invoices" # Where invoice PDFs were written before object storage
+    STORAGE_PUBLIC_URL: str = "http://localhost:8000" # Base URL of this API, used by locally signed URLs
+    STORAGE_MAX_POOL_CONNECTIONS: int = 32 # Shared S3 connection pool, also sizes the storage threads
+    STORAGE_CONNECT_TIMEOUT: float = 5.0
+    STORAGE_READ_TIMEOUT: float = 60.0
+    STORAGE_PRESIGN_CACHE_SIZE: int = 1024
+    STORAGE_PRESIGN_CACHE_MARGIN: int = 600 # A cached URL is always served with at least this many seconds of validity left
+    STORAGE_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024 # S3 requires at least 5 MiB for every part but the last
+    STORAGE_MULTIPART_CONCURRENCY: int = 4 # Parts in flight per upload: memory stays around (concurrency + 2) parts
+
+    # Logging: JSON lines written by a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000 # Records beyond this are dropped rather than blocking requests
+    LOG_ERROR_FILE: Optional[str] = "backend_error.log" # Errors are also appended here
+    LOG_SAMPLE_RATE: float = 1.0 # Share of successful requests logged; errors and slow requests always are
+    LOG_SLOW_REQUEST_MS: float = 1000.0
+    LOG_HEADERS: bool = True
+    LOG_REDACT_HEADERS: list[str] = ["authorization", "cookie", "set-cookie", "proxy-authorization", "x-api-key"]
+
+    # Prometheus metrics: set PROMETHEUS_MULTIPROC_DIR (an empty directory) when running several workers
+    METRICS_SAMPLE_INTERVAL: float = 5.0 # Seconds between refreshes of the pool and queue gauges
+
+    # Tracing of the import, reconciliation, invoicing and settlement pipelines
+    TRACING_ENABLED: bool = True
+    TRACING_EXPORTERS: list[str] = [] # "jsonl" and/or "otlp"; the last traces are always kept in memory
+    TRACING_BUFFER_SIZE: int = 100 # Traces kept for /system/traces
+    TRACING_MAX_SPANS: int = 500 # Per trace; further spans only count in the stage totals
+    TRACING_QUEUE_SIZE: int = 1000 # Traces waiting for the exporters; beyond it they are dropped
+    TRACING_JSONL_FILE: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318" # OTLP/HTTP collector
+    TRACING_OTLP_HEADERS: dict[str, str] = {}
+    TRACING_SERVICE_NAME: str = "auctify-api"
+
+    # Response compression (gzip)
+    COMPRESSION_MINIMUM_SIZE: int = 1024 # Smaller bodies are sent as-is: not worth the CPU or the header
+    COMPRESSION_LEVEL: int = 5 # 1 (fastest) to 9 (smallest); see bench_compression.py
+    COMPRESSION_EXCLUDED_TYPES: list[str] = [
+        "application/zip", "application/gzip", "application/pdf", "application/vnd.openxmlformats-officedocument",
+        "image/png", "image/jpeg", "image/webp", "image/gif", "audio/", "video/",
+    ] # Content-type prefixes that are already compressed
+
+    # SEPA pain.001 files (0 disables a limit)
+    SEPA_MAX_TXS_PER_FILE: int = 5000
+    SEPA_MAX_AMOUNT_PER_FILE: float = 0.0
+    SEPA_MAX_TXS_PER_PMTINF: int = 0
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import Request, Response
+
+# Clients revalidate every time, but may keep the body while the ETag still matches
+CACHE_CONTROL = "private, no-cache"
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_fresh(request: Request, etag: Optional[str]) -> bool:
+    """
+    True if the client already holds the representation tagged `etag`
+    (weak comparison, as If-None-Match requires).
+    """
+    if etag is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def tag_response(response: Response, etag: Optional[str]) -> Response:
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
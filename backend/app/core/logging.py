@@ -0,0 +1,106 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.core.config import settings
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with the request id and any `extra=` fields.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread through a bounded queue. When the queue is
+    full the record is dropped and counted: logging never blocks the event loop.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve everything that depends on the caller's state before crossing threads
+        record.request_id = request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+def setup_logging():
+    """
+    Routes the root logger through the queue; a background thread writes JSON lines
+    to stdout, and errors to LOG_ERROR_FILE as well. Safe to call more than once.
+    """
+    global _handler, _listener
+    if _listener:
+        return
+
+    formatter = JsonFormatter()
+    stdout = logging.StreamHandler(sys.stdout)
+    stdout.setFormatter(formatter)
+    handlers = [stdout]
+    if settings.LOG_ERROR_FILE:
+        error_file = logging.FileHandler(settings.LOG_ERROR_FILE, encoding="utf-8")
+        error_file.setLevel(logging.ERROR)
+        error_file.setFormatter(formatter)
+        handlers.append(error_file)
+
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _listener = QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(_handler)
+
+def queue_status() -> dict:
+    """
+    Records waiting to be written, and records dropped because the queue was full.
+    """
+    if not _handler:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _handler.queue.qsize(), "dropped": _handler.dropped}
+
+def redact_headers(headers) -> dict:
+    redacted = {name.lower() for name in settings.LOG_REDACT_HEADERS}
+    return {
+        name: "[REDACTED]" if name.lower() in redacted else value
+        for name, value in headers.items()
+    }
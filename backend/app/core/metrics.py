@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# With PROMETHEUS_MULTIPROC_DIR set (before the workers start), every worker writes its
+# samples to memory-mapped files in that directory and any worker can serve the sum.
+# Gauges say how per-worker values are combined; "live" modes drop dead workers.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being handled", multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections in use", multiprocess_mode="livesum")
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections held open by the pool", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened beyond the pool size", multiprocess_mode="livesum")
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Wait for a database connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT")
+
+LOG_QUEUE_DEPTH = Gauge("log_queue_depth", "Log records waiting to be written", multiprocess_mode="livesum")
+LOG_RECORDS_DROPPED = Gauge("log_records_dropped", "Log records dropped because the queue was full", multiprocess_mode="livesum")
+PASSWORD_HASHES_PENDING = Gauge("password_hashes_pending", "Password hashes queued or running", multiprocess_mode="livesum")
+
+PIPELINE_ROWS = Counter("pipeline_rows_total", "Rows processed by the import pipelines", ["stage"])
+PIPELINE_SECONDS = Counter("pipeline_seconds_total", "Time spent processing those rows", ["stage"])
+
+INVOICES_RENDERED = Counter("invoices_rendered_total", "Factur-X invoices rendered")
+INVOICE_RENDER_DURATION = Histogram(
+    "invoice_render_seconds", "Time to render one Factur-X PDF",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+STORAGE_DURATION = Histogram(
+    "storage_operation_seconds", "Latency of storage backend calls",
+    ["operation", "backend"], buckets=LATENCY_BUCKETS,
+)
+
+def record_rows(stage: str, rows: int, seconds: float):
+    """
+    Rows per second of a stage is rate(pipeline_rows_total) / rate(pipeline_seconds_total).
+    """
+    PIPELINE_ROWS.labels(stage).inc(rows)
+    PIPELINE_SECONDS.labels(stage).inc(seconds)
+
+def sample():
+    """
+    Copies this worker's pool, log queue and password hashing state into the gauges.
+    """
+    from app.core.logging import queue_status
+    from app.core import security
+    from app.db.session import pool_status
+
+    pool = pool_status()
+    DB_POOL_CHECKED_OUT.set(pool["checked_out"])
+    DB_POOL_SIZE.set(pool["size"])
+    DB_POOL_OVERFLOW.set(pool["overflow"])
+    log_queue = queue_status()
+    LOG_QUEUE_DEPTH.set(log_queue["queued"])
+    LOG_RECORDS_DROPPED.set(log_queue["dropped"])
+    PASSWORD_HASHES_PENDING.set(security._pending_hashes)
+
+class MetricsSampler:
+    """
+    Refreshes the gauges of this worker every METRICS_SAMPLE_INTERVAL seconds, so a
+    scrape served by another worker still sees it.
+    """
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            try:
+                sample()
+            except Exception:
+                logger.exception("Metrics sampling failed")
+            await asyncio.sleep(settings.METRICS_SAMPLE_INTERVAL)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if MULTIPROCESS:
+            multiprocess.mark_process_dead(os.getpid())
+
+metrics_sampler = MetricsSampler()
+
+def render() -> tuple[bytes, str]:
+    """
+    The exposition text and its content type, aggregated over all workers in
+    multiprocess mode.
+    """
+    sample()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,13 +1,25 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with another cost factor still verify, and are flagged for a rehash
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 ALGORITHM = "HS256"
 
+# bcrypt releases the GIL: a few threads hash in parallel without touching the event loop
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending_hashes = 0
+
+class PasswordHashingBusy(Exception):
+    """
+    Raised instead of queueing more than PASSWORD_HASH_MAX_PENDING hash operations.
+    """
+
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -23,3 +35,26 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+async def _run_hash(fn, *args):
+    global _pending_hashes
+    if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashingBusy()
+    _pending_hashes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _pending_hashes -= 1
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verifies a password on the hashing pool. Returns (valid, new_hash): new_hash is set
+    when the stored hash uses an outdated cost factor and should be replaced.
+    """
+    return await _run_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def hash_password(password: str) -> str:
+    """
+    get_password_hash on the hashing pool.
+    """
+    return await _run_hash(pwd_context.hash, password)
@@ -0,0 +1,20 @@
+from typing import Any
+import orjson
+from fastapi.responses import Response
+
+class ORJSONResponse(Response):
+    """
+    JSON response rendered by orjson, which handles datetimes, enums and numpy values
+    natively. Endpoints returning it directly skip response_model validation and
+    jsonable_encoder: feed it plain dicts (see rows_to_dicts).
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def rows_to_dicts(result) -> list[dict]:
+    """
+    Rows of a column select as dicts keyed by column label, without building ORM objects.
+    """
+    return [dict(row) for row in result.mappings()]
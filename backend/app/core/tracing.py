@@ -0,0 +1,343 @@
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class Span:
+    """
+    One timed operation of a trace, with free-form attributes.
+    """
+    __slots__ = ("trace", "name", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "_start", "duration", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._start = time.perf_counter()
+        self.duration = None # Seconds
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class Trace:
+    """
+    The spans under one root span. Past TRACING_MAX_SPANS, spans are only added to
+    their stage totals, so a 10,000-lot run keeps a bounded size.
+    """
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.root: Optional[Span] = None
+        self.spans: list[Span] = []
+        self.stages: dict[str, list] = {} # name -> [calls, seconds]
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self._lock:
+            stage = self.stages.setdefault(span.name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += span.duration
+            if len(self.spans) < settings.TRACING_MAX_SPANS or span is self.root:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def summary(self, include_spans: bool = False) -> dict:
+        root = self.root
+        data = {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "start_ns": root.start_ns,
+            "duration_ms": round(root.duration * 1000, 3),
+            "attributes": root.attributes,
+            "error": root.error,
+            # Per-stage timings, slowest first
+            "stages": [
+                {"name": name, "calls": calls, "total_ms": round(seconds * 1000, 3)}
+                for name, (calls, seconds) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+            ],
+            "spans_dropped": self.dropped,
+        }
+        if include_spans:
+            data["spans"] = [span.to_dict() for span in self.spans]
+        return data
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+@contextmanager
+def _run_span(trace: Trace, name: str, parent_id: Optional[str], attributes: dict):
+    current = Span(trace, name, parent_id, attributes)
+    if trace.root is None:
+        trace.root = current
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current._start
+        current.end_ns = current.start_ns + int(current.duration * 1e9)
+        trace.record(current)
+        if current is trace.root:
+            _export(trace)
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+@contextmanager
+def _noop():
+    yield _NOOP_SPAN
+
+def span(name: str, **attributes):
+    """
+    Times a block as a span of the current trace, or as the root of a new trace.
+    Works in sync and async code; tasks and threads started inside inherit it.
+
+        with tracing.span("import.mapping", auction_id=auction_id) as s:
+            ...
+            s.set_attribute("rows", len(df))
+    """
+    if not settings.TRACING_ENABLED:
+        return _noop()
+    parent = _current_span.get()
+    if parent is None:
+        return _run_span(Trace(), name, None, attributes)
+    return _run_span(parent.trace, name, parent.span_id, attributes)
+
+def child_span(name: str, **attributes):
+    """
+    A span only when a trace is in progress: for shared building blocks (storage,
+    VAT, renderers) that should not start traces of their own.
+    """
+    parent = _current_span.get()
+    if parent is None or not settings.TRACING_ENABLED:
+        return _noop()
+    return _run_span(parent.trace, name, parent.span_id, attributes)
+
+def current_span():
+    return _current_span.get() or _NOOP_SPAN
+
+def traced(name: str, *attribute_args: str, root: bool = True):
+    """
+    Runs a function (sync or async) in a span, with the named arguments as attributes.
+    With root=False it is a child_span: nothing is recorded outside a trace.
+    """
+    open_span = span if root else child_span
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def attributes(args, kwargs) -> dict:
+            if not attribute_args:
+                return {}
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            return {arg: bound.get(arg) for arg in attribute_args}
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with open_span(name, **attributes(args, kwargs)):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with open_span(name, **attributes(args, kwargs)):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, trace: Trace):
+        """
+        Sends a finished trace. Called on the export thread, except for the memory buffer.
+        """
+
+class MemoryExporter(SpanExporter):
+    """
+    Keeps the last finished traces for the /system/traces endpoint.
+    """
+    def __init__(self, maxsize: int):
+        self.traces: deque = deque(maxlen=maxsize)
+
+    def export(self, trace: Trace):
+        self.traces.append(trace)
+
+    def recent(self, limit: int) -> list[Trace]:
+        return list(self.traces)[-limit:][::-1] if limit > 0 else []
+
+class JsonLinesExporter(SpanExporter):
+    """
+    Appends one JSON line per span to a local file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, trace: Trace):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for s in trace.spans:
+                f.write(json.dumps(s.to_dict(), default=str, ensure_ascii=False) + "\n")
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+class OTLPExporter(SpanExporter):
+    """
+    Sends traces to an OpenTelemetry collector with OTLP/HTTP (JSON encoding).
+    Stage totals of spans past TRACING_MAX_SPANS are attached to the root span.
+    """
+    def __init__(self, endpoint: str, headers: Optional[dict] = None, timeout: float = 5.0):
+        import httpx
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.client = httpx.Client(headers=headers or {}, timeout=timeout)
+
+    def _span(self, s: Span) -> dict:
+        attributes = dict(s.attributes)
+        if s is s.trace.root and s.trace.dropped:
+            attributes["spans_dropped"] = s.trace.dropped
+            for name, (calls, seconds) in s.trace.stages.items():
+                attributes[f"stage.{name}.calls"] = calls
+                attributes[f"stage.{name}.ms"] = round(seconds * 1000, 3)
+        data = {
+            "traceId": s.trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1, # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": _otlp_attributes(attributes),
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            data["parentSpanId"] = s.parent_id
+        return data
+
+    def export(self, trace: Trace):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": settings.TRACING_SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [self._span(s) for s in trace.spans],
+                }],
+            }],
+        }
+        response = self.client.post(self.url, json=payload)
+        response.raise_for_status()
+
+memory_exporter = MemoryExporter(settings.TRACING_BUFFER_SIZE)
+
+class _ExportWorker:
+    """
+    Runs the file and network exporters on a background thread, through a bounded
+    queue: finished traces are dropped rather than slowing requests down.
+    """
+    def __init__(self):
+        self.exporters: list[SpanExporter] = []
+        self.queue: queue.Queue = queue.Queue(maxsize=settings.TRACING_QUEUE_SIZE)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, exporters: list[SpanExporter]):
+        self.exporters = exporters
+        if exporters and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, trace: Trace):
+        if not self.exporters:
+            return
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            trace = self.queue.get()
+            if trace is None:
+                return
+            for exporter in self.exporters:
+                try:
+                    exporter.export(trace)
+                except Exception as e:
+                    logger.warning("Trace export failed (%s): %s", type(exporter).__name__, e)
+
+    def stop(self):
+        if self._thread:
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+_worker = _ExportWorker()
+
+def _export(trace: Trace):
+    memory_exporter.export(trace)
+    _worker.submit(trace)
+
+def setup_tracing():
+    """
+    Starts the exporters listed in TRACING_EXPORTERS besides the in-memory buffer:
+    "jsonl" (TRACING_JSONL_FILE) and "otlp" (TRACING_OTLP_ENDPOINT).
+    """
+    exporters = []
+    if "jsonl" in settings.TRACING_EXPORTERS:
+        exporters.append(JsonLinesExporter(settings.TRACING_JSONL_FILE))
+    if "otlp" in settings.TRACING_EXPORTERS:
+        exporters.append(OTLPExporter(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_OTLP_HEADERS))
+    _worker.start(exporters)
+
+def recent_traces(limit: int = 20, include_spans: bool = False) -> list[dict]:
+    return [trace.summary(include_spans) for trace in memory_exporter.recent(limit)]
@@ -0,0 +1,82 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class QueryStats:
+    """
+    Statements run and time spent in the database within a tracked scope.
+    """
+    def __init__(self, record: bool = False):
+        self.count = 0
+        self.duration = 0.0 # Seconds
+        self.statements = [] if record else None
+
+    def add(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+# Scopes can nest (e.g. a test around a request): every active scope sees each statement
+_active_stats: ContextVar[tuple] = ContextVar("active_query_stats", default=())
+_endpoint: ContextVar[Optional[str]] = ContextVar("query_endpoint", default=None)
+
+@contextmanager
+def track_queries(endpoint: Optional[str] = None, record: bool = False):
+    """
+    Counts the statements run by the current task (and the tasks it starts) until exit.
+    `endpoint` labels slow-query log lines; `record` keeps the SQL text.
+    """
+    stats = QueryStats(record)
+    stats_token = _active_stats.set(_active_stats.get() + (stats,))
+    endpoint_token = _endpoint.set(endpoint) if endpoint else None
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(stats_token)
+        if endpoint_token:
+            _endpoint.reset(endpoint_token)
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """
+    Catches N+1 regressions (check_query_budgets.py runs it over the list endpoints):
+
+        with assert_max_queries(3):
+            response = await client.get("/api/v1/auctions/")
+    """
+    with track_queries(record=True) as stats:
+        yield stats
+    if stats.count > limit:
+        statements = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(stats.statements, 1))
+        raise AssertionError(f"{stats.count} queries run, at most {limit} expected:\n{statements}")
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    for stats in _active_stats.get():
+        stats.add(statement, duration)
+
+    if settings.DB_SLOW_QUERY_MS and duration * 1000 >= settings.DB_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms) in %s: %s",
+            duration * 1000, _endpoint.get() or "background task", " ".join(statement.split()),
+        )
+
+def instrument(engine):
+    """
+    Registers the statement hooks on an engine (the sync engine of an AsyncEngine).
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,13 +1,123 @@
+import threading
+import time
+from collections import deque
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core import metrics
 from app.core.config import settings
+from app.db import query_stats
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+class PoolStats:
+    """
+    Connection checkout wait times, shared by every pool of the process
+    (a pool recreated after a disconnect keeps reporting here).
+    """
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._recent.append(wait)
+        metrics.DB_POOL_WAIT.observe(wait)
+        if timed_out:
+            metrics.DB_POOL_TIMEOUTS.inc()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts, timeouts, wait_total, wait_max = self.checkouts, self.timeouts, self.wait_total, self.wait_max
+
+        def percentile(q: float) -> float:
+            return recent[min(len(recent) - 1, int(q * len(recent)))] if recent else 0.0
+
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_avg_ms": wait_total / checkouts * 1000 if checkouts else 0.0,
+            "wait_max_ms": wait_max * 1000,
+            # Over the last checkouts only
+            "wait_p50_ms": percentile(0.50) * 1000,
+            "wait_p95_ms": percentile(0.95) * 1000,
+            "wait_p99_ms": percentile(0.99) * 1000,
+        }
+
+pool_stats = PoolStats()
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool timing every checkout: the wait for a free connection, or to open a
+    new one within the overflow.
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return connection
+
+def database_url():
+    url = make_url(settings.DATABASE_URL)
+    if url.drivername.endswith("+asyncpg"):
+        # SQLAlchemy's cache of asyncpg prepared statements, per connection (0 disables it)
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+    return url
+
+def connect_args() -> dict:
+    if settings.DB_STATEMENT_CACHE_SIZE == 0 and make_url(settings.DATABASE_URL).drivername.endswith("+asyncpg"):
+        # Behind PgBouncer in transaction mode, asyncpg must not prepare statements either
+        return {"statement_cache_size": 0}
+    return {}
+
+engine = create_async_engine(
+    database_url(),
+    echo=settings.DB_ECHO,
+    poolclass=InstrumentedAsyncPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=connect_args(),
+)
+
+query_stats.instrument(engine.sync_engine)
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+def pool_status() -> dict:
+    """
+    Current pool utilization and checkout wait statistics.
+    """
+    pool = engine.pool
+    capacity = settings.DB_POOL_SIZE + max(settings.DB_MAX_OVERFLOW, 0)
+    return {
+        "size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # QueuePool counts overflow from -pool_size until the pool is full
+        "overflow": max(pool.overflow(), 0),
+        "utilization": pool.checkedout() / capacity if capacity else 0.0,
+        **pool_stats.snapshot(),
+    }
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
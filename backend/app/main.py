@@ -1,7 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.endpoints import import_api, reconciliation_api, invoices_api, settlements_api, login, company, auctions, users, actors
+from app.core import metrics
+from app.core.compression import CompressionMiddleware
+from app.core.logging import setup_logging, request_id, redact_headers
+from app.core.tracing import setup_tracing
+from app.core.cache import invalidation_bus
+from app.core.security import PasswordHashingBusy
+from app.db.query_stats import track_queries
+from app.api.endpoints import import_api, reconciliation_api, invoices_api, settlements_api, login, company, auctions, users, actors, storage_api, system
+
+setup_logging()
+setup_tracing()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -9,30 +19,74 @@ app = FastAPI(
 )
 
 from fastapi import Request
-from fastapi.responses import JSONResponse
-import traceback
+from fastapi.responses import JSONResponse, Response
+import logging
+import random
+import time
+import uuid
+
+logger = logging.getLogger("app.requests")
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    with open("backend_error.log", "a") as f:
-        f.write(f"Global error: {str(exc)}\n")
-        f.write(traceback.format_exc())
+    logger.error(
+        f"Global error: {str(exc)}",
+        exc_info=exc,
+        extra={"method": request.method, "path": request.url.path},
+    )
     return JSONResponse(
         status_code=500,
         content={"message": "Internal Server Error"},
     )
 
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    # Login storms are shed instead of queueing behind bcrypt
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many logins in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    print(f"Incoming request: {request.method} {request.url}")
-    print(f"Headers: {request.headers}")
+    """
+    One structured line per request: status, latency and database statements
+    (also reported in a Server-Timing header). Successful, fast requests are sampled.
+    """
+    rid = request.headers.get("x-request-id") or uuid.uuid4().hex
+    request_id.set(rid)
+    start = time.perf_counter()
+    status = 500
+    metrics.HTTP_REQUESTS_IN_PROGRESS.inc()
     try:
-        response = await call_next(request)
-        print(f"Response status: {response.status_code}")
+        with track_queries(endpoint=f"{request.method} {request.url.path}") as stats:
+            response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = rid
+        response.headers.append("Server-Timing", stats.server_timing())
         return response
-    except Exception as e:
-        print(f"Request failed: {str(e)}")
-        raise e
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        metrics.HTTP_REQUESTS_IN_PROGRESS.dec()
+        # Route templates keep the label set bounded; unmatched paths share one label
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_DURATION.labels(
+            request.method, route.path if route else "unmatched", str(status)
+        ).observe(duration_ms / 1000)
+        if status >= 400 or duration_ms >= settings.LOG_SLOW_REQUEST_MS or random.random() < settings.LOG_SAMPLE_RATE:
+            fields = {
+                "method": request.method,
+                "path": request.url.path,
+                "query": request.url.query or None,
+                "status": status,
+                "duration_ms": round(duration_ms, 1),
+                "db_queries": stats.count,
+                "db_ms": round(stats.duration * 1000, 1),
+            }
+            if settings.LOG_HEADERS:
+                fields["headers"] = redact_headers(request.headers)
+            logger.log(logging.WARNING if status >= 500 else logging.INFO, f"{request.method} {request.url.path} {status}", extra=fields)
 
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
@@ -44,6 +98,8 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(login.router, prefix=f"{settings.API_V1_STR}", tags=["login"])
 app.include_router(import_api.router, prefix=f"{settings.API_V1_STR}/import", tags=["import"])
 app.include_router(reconciliation_api.router, prefix=f"{settings.API_V1_STR}/reconciliation", tags=["reconciliation"])
@@ -53,6 +109,32 @@ app.include_router(company.router, prefix=f"{settings.API_V1_STR}/company", tags
 app.include_router(auctions.router, prefix=f"{settings.API_V1_STR}/auctions", tags=["auctions"])
 app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
 app.include_router(actors.router, prefix=f"{settings.API_V1_STR}/actors", tags=["actors"])
+app.include_router(storage_api.router, prefix=f"{settings.API_V1_STR}/storage", tags=["storage"])
+app.include_router(system.router, prefix=f"{settings.API_V1_STR}/system", tags=["system"])
+
+@app.on_event("startup")
+async def start_cache_invalidation():
+    invalidation_bus.start()
+
+@app.on_event("shutdown")
+async def stop_cache_invalidation():
+    await invalidation_bus.stop()
+
+@app.on_event("startup")
+async def start_metrics_sampler():
+    metrics.metrics_sampler.start()
+
+@app.on_event("shutdown")
+async def stop_metrics_sampler():
+    await metrics.metrics_sampler.stop()
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """
+    Prometheus scrape endpoint.
+    """
+    content, content_type = metrics.render()
+    return Response(content, media_type=content_type)
 
 @app.get("/")
 async def root():
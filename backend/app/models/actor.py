@@ -17,6 +17,8 @@ class Actor(Base):
     address = Column(String, nullable=True)
     iban = Column(String, nullable=True)
     bic = Column(String, nullable=True)
+    iban_hash = Column(String, nullable=True) # SHA256 of the normalized IBAN last validated
+    iban_valid = Column(Boolean, nullable=True) # Validation result for that IBAN
     vat_subject = Column(Boolean, default=False, nullable=False)
     
     lots_sold = relationship("Lot", back_populates="seller", foreign_keys="Lot.seller_id")
@@ -18,5 +18,6 @@ class Auction(Base):
     buyer_fee_rate = Column(Float, default=0.20, nullable=False)
     seller_fee_rate = Column(Float, default=0.05, nullable=False)
     platform_fee_rate = Column(Float, default=0.0, nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False) # Bumped by every write to the auction's data (ETags)
     
     lots = relationship("Lot", back_populates="auction")
@@ -15,3 +15,4 @@ class CompanySettings(Base):
     logo_facture = Column(String, nullable=True)
     logo_decompte = Column(String, nullable=True)
     legal_mentions = Column(Text, nullable=True)
+    version = Column(Integer, default=1, server_default="1", nullable=False) # Bumped on update (ETags)
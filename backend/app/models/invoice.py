@@ -1,7 +1,7 @@
 import enum
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.db.base import Base
 
 class InvoiceStatus(str, enum.Enum):
@@ -21,8 +21,8 @@ class Invoice(Base):
     
     status = Column(Enum(InvoiceStatus), default=InvoiceStatus.DRAFT, nullable=False)
     
-    pdf_path = Column(String, nullable=True)
-    xml_content = Column(Text, nullable=True)
+    pdf_path = Column(String, nullable=True) # Storage key; older rows hold a local file path
+    xml_content = deferred(Column(Text, nullable=True)) # Only loaded by the download endpoint
     
     # Compliance / Chaining
     hash = Column(String, nullable=True)
@@ -0,0 +1,9 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from app.db.base import Base
+
+class InvoiceChainCheckpoint(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    invoice_id = Column(Integer, ForeignKey("invoice.id"), index=True, nullable=False) # Last verified invoice
+    hash = Column(String, nullable=False) # Hash of that invoice at verification time
+    verified_at = Column(DateTime, default=datetime.utcnow, nullable=False)
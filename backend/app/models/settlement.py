@@ -3,6 +3,7 @@ from datetime import datetime
 from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
+from app.models.settlement_batch import SettlementBatch
 
 class SettlementStatus(str, enum.Enum):
     CREATED = "CREATED"
@@ -13,11 +14,15 @@ class Settlement(Base):
     auction_id = Column(Integer, ForeignKey("auction.id"), nullable=False)
     seller_id = Column(Integer, ForeignKey("actor.id"), nullable=False)
     
+    hammer_total = Column(Float, nullable=True) # Sum of hammer prices
+    seller_fees = Column(Float, nullable=True) # Seller commission, excl. VAT
+    seller_fees_vat = Column(Float, nullable=True)
     amount = Column(Float, nullable=False) # Net amount to pay to seller
     status = Column(Enum(SettlementStatus), default=SettlementStatus.CREATED, nullable=False)
     
-    xml_content = Column(Text, nullable=True) # Generated SEPA XML content
+    batch_id = Column(Integer, ForeignKey("settlementbatch.id"), index=True, nullable=True) # SEPA file paying this settlement
     created_at = Column(DateTime, default=datetime.utcnow)
     
     auction = relationship("Auction")
     seller = relationship("Actor")
+    batch = relationship(SettlementBatch, back_populates="settlements")
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, LargeBinary
+from sqlalchemy.orm import relationship, deferred
+from app.db.base import Base
+
+class SettlementBatch(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(String, unique=True, index=True, nullable=False) # SEPA GrpHdr/MsgId
+    nb_of_txs = Column(Integer, nullable=False)
+    control_sum = Column(Float, nullable=False)
+
+    xml_gz = deferred(Column(LargeBinary, nullable=True)) # Gzipped pain.001 document
+    storage_key = Column(String, nullable=True) # Set instead of xml_gz when the file lives in object storage
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    settlements = relationship("Settlement", back_populates="batch")
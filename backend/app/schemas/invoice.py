@@ -0,0 +1,25 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+from app.models.invoice import InvoiceStatus
+
+class InvoiceSummary(BaseModel):
+    id: int
+    number: Optional[str] = None
+    buyer_id: int
+    auction_id: int
+    total_excl: float
+    total_vat: float
+    total_incl: float
+    status: InvoiceStatus
+    signature_date: Optional[datetime] = None
+    hash: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class InvoicePage(BaseModel):
+    items: List[InvoiceSummary]
+    total: int
+    skip: int
+    limit: int
@@ -0,0 +1,49 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+from app.models.settlement import SettlementStatus
+
+class SettlementSeller(BaseModel):
+    id: int
+    name: str
+    iban: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class SettlementSummary(BaseModel):
+    id: int
+    auction_id: int
+    seller_id: int
+    hammer_total: Optional[float] = None
+    seller_fees: Optional[float] = None
+    seller_fees_vat: Optional[float] = None
+    amount: float
+    status: SettlementStatus
+    batch_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    seller: SettlementSeller
+
+    class Config:
+        from_attributes = True
+
+class SettlementPage(BaseModel):
+    items: List[SettlementSummary]
+    total: int
+    skip: int
+    limit: int
+
+class SettlementBatchSummary(BaseModel):
+    id: int
+    message_id: str
+    nb_of_txs: int
+    control_sum: float
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ConsolidatedSettlementRequest(BaseModel):
+    auction_ids: Optional[List[int]] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
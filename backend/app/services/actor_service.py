@@ -0,0 +1,29 @@
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.cache import SharedCache
+from app.core.tracing import child_span
+from app.models.actor import Actor, ActorType
+
+# "<type>:<field>:<value>" -> actor id. Only committed actors are cached: callers keep
+# the ids of actors they create themselves until their transaction commits.
+# actors.py clears the namespace when an actor is renamed or deleted.
+actor_ids = SharedCache("actors", maxsize=50000, ttl=3600)
+
+class ActorService:
+    @staticmethod
+    async def find_id(db: AsyncSession, actor_type: ActorType, name: Optional[str] = None, email: Optional[str] = None) -> Optional[int]:
+        """
+        Id of the actor of this type with this email (or name), as looked up for every
+        row of an import.
+        """
+        field, column, value = ("email", Actor.email, email) if email else ("name", Actor.name, name)
+
+        async def load() -> Optional[int]:
+            with child_span("actors.lookup"):
+                result = await db.execute(
+                    select(Actor.id).where(column == value, Actor.type == actor_type).order_by(Actor.id).limit(1)
+                )
+                return result.scalar()
+
+        return await actor_ids.get_or_load(f"{actor_type.value}:{field}:{value}", load)
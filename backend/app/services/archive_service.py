@@ -0,0 +1,105 @@
+import logging
+import os
+import zipfile
+from datetime import datetime
+from app.core.config import settings
+from app.services.storage_service import storage_service
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+class _ChunkSink:
+    """
+    Write-only file object for ZipFile. It has no tell/seek, so ZipFile falls back
+    to data descriptors and never needs to rewind; written bytes are handed out
+    with drain() as soon as they are produced.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ArchiveService:
+    @staticmethod
+    def stream_zip(entries):
+        """
+        Builds a ZIP archive on the fly from (name, date, chunk iterator) entries.
+        Entries are stored without recompression (PDFs are already compressed) and
+        bytes are yielded as each chunk is written, so memory stays at one chunk.
+        """
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            for name, date, chunks in entries:
+                info = zipfile.ZipInfo(name, date_time=(date or datetime.utcnow()).timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with archive.open(info, mode="w") as dest:
+                    for chunk in chunks:
+                        dest.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                data = sink.drain()
+                if data:
+                    yield data
+        yield sink.drain()
+
+    @staticmethod
+    def _is_legacy_path(path: str) -> bool:
+        """
+        Older invoices hold the absolute path of a PDF written to LEGACY_INVOICE_DIR;
+        anything else is a storage key, even if a local file happens to have that name.
+        """
+        if not os.path.isabs(path):
+            return False
+        legacy_dir = os.path.abspath(settings.LEGACY_INVOICE_DIR)
+        path = os.path.abspath(path)
+        return os.path.commonpath([path, legacy_dir]) == legacy_dir and path != legacy_dir
+
+    @staticmethod
+    def _open_document(path: str):
+        """
+        Returns a chunk iterator for a document stored in object storage, or in the
+        legacy invoice directory.
+        """
+        if ArchiveService._is_legacy_path(path):
+            def read_local():
+                with open(path, "rb") as f:
+                    while chunk := f.read(CHUNK_SIZE):
+                        yield chunk
+            return read_local()
+        return storage_service.open_stream(path, chunk_size=CHUNK_SIZE)
+
+    @staticmethod
+    def stream_invoice_archive(invoices: list):
+        """
+        Streams a ZIP of invoice PDFs. `invoices` holds (number, pdf_path, signature_date) rows.
+        Documents that cannot be read are listed in a trailing text entry instead of failing
+        the whole download halfway through.
+        """
+        missing = []
+
+        def entries():
+            for number, pdf_path, signature_date in invoices:
+                try:
+                    chunks = ArchiveService._open_document(pdf_path)
+                except Exception as e:
+                    logger.warning("Cannot read invoice %s from %s: %s", number, pdf_path, e)
+                    missing.append(str(number))
+                    continue
+                yield f"facture_{number}.pdf", signature_date, chunks
+
+            if missing:
+                yield "factures_manquantes.txt", None, ["\n".join(missing).encode("utf-8")]
+
+        return ArchiveService.stream_zip(entries())
@@ -0,0 +1,29 @@
+from typing import NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.cache import SharedCache
+from app.models.auction import Auction
+
+class AuctionFees(NamedTuple):
+    buyer_fee_rate: float
+    seller_fee_rate: float
+    platform_fee_rate: float
+
+# auction id -> AuctionFees; auctions.py publishes on update and delete
+auction_fees = SharedCache("auctions", maxsize=1024, ttl=3600, key_type=int)
+
+class AuctionService:
+    @staticmethod
+    async def fees(db: AsyncSession, auction_id: int) -> Optional[AuctionFees]:
+        """
+        Fee rates of an auction, or None if it does not exist.
+        """
+        async def load() -> Optional[AuctionFees]:
+            result = await db.execute(
+                select(Auction.buyer_fee_rate, Auction.seller_fee_rate, Auction.platform_fee_rate)
+                .where(Auction.id == auction_id)
+            )
+            row = result.first()
+            return AuctionFees(*row) if row else None
+
+        return await auction_fees.get_or_load(auction_id, load)
@@ -0,0 +1,123 @@
+import hashlib
+import re
+import numpy as np
+import pandas as pd
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.actor import Actor
+
+IBAN_PATTERN = r"[A-Z]{2}[0-9]{2}[A-Z0-9]{11,30}"
+BIC_PATTERN = r"[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}(?:[A-Z0-9]{3})?"
+
+# ISO 13616: letters are replaced by two digits, A=10 ... Z=35
+IBAN_LETTERS = {ord(letter): str(value) for value, letter in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZ", 10)}
+
+class BankValidationService:
+    @staticmethod
+    def normalize(value) -> str:
+        if value is None or (isinstance(value, float) and pd.isna(value)):
+            return ""
+        return "".join(str(value).split()).upper()
+
+    @staticmethod
+    def iban_hash(iban: str) -> str:
+        return hashlib.sha256(BankValidationService.normalize(iban).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def iban_checksums(ibans: pd.Series) -> np.ndarray:
+        """
+        Mod-97 check of well-formed IBANs, vectorized: every IBAN becomes a row of
+        digits and the remainder is carried column by column for the whole batch.
+        """
+        if ibans.empty:
+            return np.zeros(0, dtype=bool)
+
+        digits = (ibans.str[4:] + ibans.str[:4]).str.translate(IBAN_LETTERS)
+        width = int(digits.str.len().max())
+        # Leading zeros do not change the remainder
+        padded = digits.str.rjust(width, "0")
+        matrix = np.frombuffer("".join(padded).encode("ascii"), dtype=np.uint8).reshape(-1, width) - ord("0")
+
+        remainder = np.zeros(len(ibans), dtype=np.int64)
+        for column in matrix.T:
+            remainder = (remainder * 10 + column) % 97
+        return remainder == 1
+
+    @staticmethod
+    def validate_ibans(ibans: pd.Series) -> np.ndarray:
+        ibans = ibans.reset_index(drop=True)
+        valid = ibans.str.fullmatch(IBAN_PATTERN).to_numpy(dtype=bool, copy=True)
+        if valid.any():
+            valid[valid] = BankValidationService.iban_checksums(ibans[valid])
+        return valid
+
+    @staticmethod
+    def validate_debtor(name: str, iban: str, bic: str) -> list[dict]:
+        """
+        Checks the account paying a run (the company settings), with the same rules and
+        error format as the creditors; seller_id is None.
+        """
+        iban = BankValidationService.normalize(iban)
+        bic = BankValidationService.normalize(bic)
+        error = {"seller_id": None, "seller_name": name}
+        if not iban:
+            return [{**error, "field": "company_iban", "value": None, "reason": "Missing company IBAN"}]
+        errors = []
+        if not BankValidationService.validate_ibans(pd.Series([iban]))[0]:
+            errors.append({**error, "field": "company_iban", "value": iban, "reason": "Invalid company IBAN format or checksum"})
+        # Like creditor BICs, optional (DbtrAgt is then sent without it) but well-formed when given
+        if bic and not re.fullmatch(BIC_PATTERN, bic):
+            errors.append({**error, "field": "company_bic", "value": bic, "reason": "Invalid company BIC format"})
+        return errors
+
+    @staticmethod
+    async def validate_creditors(db: AsyncSession, creditors: list) -> list[dict]:
+        """
+        Checks the bank details of every creditor of a payment run before any XML is written.
+
+        `creditors` are rows with seller_id, seller_name, iban, bic, iban_hash and iban_valid.
+        IBAN results are cached on Actor, keyed by a hash of the IBAN: only new or changed
+        IBANs are recomputed, and their results are written back in one statement.
+        Returns the list of errors, empty when the run can proceed.
+        """
+        frame = pd.DataFrame(
+            [
+                {
+                    "seller_id": row.seller_id,
+                    "seller_name": row.seller_name,
+                    "iban": BankValidationService.normalize(row.iban),
+                    "bic": BankValidationService.normalize(row.bic),
+                    "cached_hash": row.iban_hash,
+                    "cached_valid": row.iban_valid,
+                }
+                for row in creditors
+            ],
+            columns=["seller_id", "seller_name", "iban", "bic", "cached_hash", "cached_valid"],
+        ).drop_duplicates("seller_id")
+
+        frame["iban_hash"] = frame["iban"].map(BankValidationService.iban_hash)
+        frame["iban_valid"] = frame["cached_valid"].where(frame["cached_hash"] == frame["iban_hash"])
+
+        stale = frame["iban_valid"].isna() & (frame["iban"] != "")
+        if stale.any():
+            frame.loc[stale, "iban_valid"] = BankValidationService.validate_ibans(frame.loc[stale, "iban"])
+            # ORM bulk UPDATE by primary key: a single executemany
+            await db.execute(
+                update(Actor),
+                [
+                    {"id": int(seller_id), "iban_hash": iban_hash, "iban_valid": bool(valid)}
+                    for seller_id, iban_hash, valid in frame.loc[stale, ["seller_id", "iban_hash", "iban_valid"]].itertuples(index=False)
+                ],
+            )
+
+        # BIC is optional for SEPA transfers, but must be well-formed when given
+        bic_invalid = (frame["bic"] != "") & ~frame["bic"].str.fullmatch(BIC_PATTERN)
+
+        errors = []
+        for row in frame[frame["iban"] == ""].itertuples():
+            errors.append({"seller_id": int(row.seller_id), "seller_name": row.seller_name, "field": "iban", "value": None, "reason": "Missing IBAN"})
+        for row in frame[(frame["iban"] != "") & (frame["iban_valid"] == False)].itertuples():
+            errors.append({"seller_id": int(row.seller_id), "seller_name": row.seller_name, "field": "iban", "value": row.iban, "reason": "Invalid IBAN format or checksum"})
+        for row in frame[bic_invalid].itertuples():
+            errors.append({"seller_id": int(row.seller_id), "seller_name": row.seller_name, "field": "bic", "value": row.bic, "reason": "Invalid BIC format"})
+        return errors
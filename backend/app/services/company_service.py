@@ -0,0 +1,71 @@
+from typing import NamedTuple, Optional
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.cache import SharedCache
+from app.models.company import CompanySettings
+from app.services.image_service import ImageService
+from app.services.storage_service import storage_service
+
+LOGO_FIELDS = ['logo_url', 'logo_bordereau', 'logo_facture', 'logo_decompte']
+
+class CompanySnapshot(NamedTuple):
+    """
+    Read-only copy of the company settings, shared by the API and the document
+    renderers. Logo fields hold storage keys.
+    """
+    id: int
+    name: str
+    siret: str
+    address: str
+    iban: str
+    bic: str
+    logo_url: Optional[str]
+    logo_bordereau: Optional[str]
+    logo_facture: Optional[str]
+    logo_decompte: Optional[str]
+    legal_mentions: Optional[str]
+    version: int
+
+# A single entry; company.py publishes on update and logo upload
+company_snapshots = SharedCache("company", maxsize=1, ttl=3600)
+
+class CompanyService:
+    @staticmethod
+    def snapshot(settings: CompanySettings) -> CompanySnapshot:
+        return CompanySnapshot(**{field: getattr(settings, field) for field in CompanySnapshot._fields})
+
+    @staticmethod
+    async def get(db: AsyncSession) -> Optional[CompanySnapshot]:
+        """
+        The company settings, read from the database once per process until they change.
+        None if they were never saved.
+        """
+        async def load() -> Optional[CompanySnapshot]:
+            result = await db.execute(
+                select(*(getattr(CompanySettings, field) for field in CompanySnapshot._fields))
+            )
+            row = result.first()
+            return CompanySnapshot(*row) if row else None
+
+        return await company_snapshots.get_or_load("settings", load)
+
+    @staticmethod
+    async def changed(db: AsyncSession):
+        """
+        Called by every write to the settings or their logo files: bumps their version
+        (ETags) and drops the snapshot in every worker once `db`'s transaction commits.
+        """
+        await db.execute(update(CompanySettings).values(version=CompanySettings.version + 1))
+        await company_snapshots.publish(db)
+
+    @staticmethod
+    def presigned(snapshot: CompanySnapshot) -> dict:
+        """
+        The settings for display, with presigned URLs of the web variants of the logos.
+        """
+        data = snapshot._asdict()
+        for field in LOGO_FIELDS:
+            if data[field]:
+                data[field] = storage_service.get_presigned_url(ImageService.variant_key(data[field], "web"))
+        return data
@@ -1,7 +1,15 @@
 import hashlib
 from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import load_only
+from app.models.invoice import Invoice
+from app.models.invoice_checkpoint import InvoiceChainCheckpoint
 
 class ComplianceService:
+    GENESIS_HASH = "GENESIS_HASH"
+
     @staticmethod
     def sign_invoice(invoice, previous_hash: str = None) -> str:
         """
@@ -9,5 +17,75 @@ class ComplianceService:
         """
         # Data to sign
         data = f"{invoice.number}|{invoice.buyer_id}|{invoice.total_incl}|{invoice.signature_date}|{previous_hash}"
-        
+
         return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    async def verify_chain(db: AsyncSession, resume: bool = True, batch_size: int = 500) -> dict:
+        """
+        Walks the invoice chain in id order and recomputes every hash.
+
+        Invoices are streamed through a server-side cursor, so memory stays flat
+        whatever the size of the history. When `resume` is set, verification starts
+        after the last persisted checkpoint, provided the checkpointed invoice still
+        carries the hash recorded at the time.
+
+        A checkpoint for the verified part is added to `db`; the caller commits it.
+        """
+        previous_hash = ComplianceService.GENESIS_HASH
+        start_after = 0
+        resumed_from = None
+
+        if resume:
+            result = await db.execute(
+                select(InvoiceChainCheckpoint).order_by(InvoiceChainCheckpoint.invoice_id.desc()).limit(1)
+            )
+            checkpoint = result.scalars().first()
+            if checkpoint:
+                anchor = await db.execute(select(Invoice.hash).where(Invoice.id == checkpoint.invoice_id))
+                # A modified anchor invalidates the checkpoint: rescan from the start
+                if anchor.scalar() == checkpoint.hash:
+                    start_after = checkpoint.invoice_id
+                    previous_hash = checkpoint.hash
+                    resumed_from = checkpoint.invoice_id
+
+        stream = await db.stream(
+            select(Invoice)
+            .options(load_only(
+                Invoice.id, Invoice.number, Invoice.buyer_id, Invoice.total_incl,
+                Invoice.signature_date, Invoice.hash, Invoice.previous_hash,
+            ))
+            .where(Invoice.id > start_after)
+            .order_by(Invoice.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        verified = 0
+        last_id = start_after
+        error: Optional[dict] = None
+        async for invoice in stream.scalars():
+            reason = None
+            if invoice.previous_hash != previous_hash:
+                reason = "previous_hash does not match the preceding invoice"
+            elif invoice.hash != ComplianceService.sign_invoice(invoice, invoice.previous_hash):
+                reason = "hash does not match invoice content"
+            if reason:
+                error = {"invoice_id": invoice.id, "number": invoice.number, "reason": reason}
+                break
+            previous_hash = invoice.hash
+            last_id = invoice.id
+            verified += 1
+        await stream.close()
+
+        # Everything up to last_id is verified, even if a break was found after it
+        if last_id != start_after:
+            db.add(InvoiceChainCheckpoint(invoice_id=last_id, hash=previous_hash, verified_at=datetime.utcnow()))
+
+        return {
+            "valid": error is None,
+            "verified": verified,
+            "resumed_from": resumed_from,
+            "last_invoice_id": last_id or None,
+            "last_hash": previous_hash,
+            "error": error,
+        }
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import io
+import logging
+from typing import NamedTuple, Optional
+from PIL import Image, ImageOps
+from app.core.cache import TTLCache
+from app.services.storage_service import storage_service
+
+logger = logging.getLogger(__name__)
+
+class LogoImage(NamedTuple):
+    data: bytes
+    width: int # Pixels
+    height: int
+
+class LogoVariant(NamedTuple):
+    suffix: str
+    max_size: tuple[int, int]
+    format: str
+    content_type: str
+
+# PDF headers: about 60 x 25 mm at 300 dpi, as JPEG so ReportLab embeds it without re-encoding.
+# Web: twice the displayed size for high-density screens, WebP keeps transparency.
+LOGO_VARIANTS = {
+    "pdf": LogoVariant(".pdf.jpg", (720, 300), "JPEG", "image/jpeg"),
+    "web": LogoVariant(".web.webp", (480, 200), "WEBP", "image/webp"),
+}
+
+class ImageService:
+    # Logo variants already loaded by this process: storage key -> content hash -> image.
+    # Keys are never reused (one UUID per upload), so cached entries never go stale.
+    _logo_hashes = TTLCache(maxsize=256, ttl=3600)
+    _logos = TTLCache(maxsize=32, ttl=3600)
+
+    @staticmethod
+    def variant_key(key: str, variant: str) -> str:
+        return f"{key}{LOGO_VARIANTS[variant].suffix}"
+
+    @staticmethod
+    def original_key(key: str) -> str:
+        """
+        Key of the uploaded file, given the key of one of its variants (or itself).
+        """
+        for variant in LOGO_VARIANTS.values():
+            if key and key.endswith(variant.suffix):
+                return key[:-len(variant.suffix)]
+        return key
+
+    @staticmethod
+    def render_variant(image: Image.Image, variant: LogoVariant) -> bytes:
+        image = image.copy()
+        image.thumbnail(variant.max_size, Image.LANCZOS)
+        if variant.format == "JPEG":
+            # No alpha in JPEG: flatten onto the white page background
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, "white")
+            image.paste(rgba, mask=rgba.getchannel("A"))
+            options = {"quality": 85, "optimize": True, "progressive": False}
+        else:
+            image = image.convert("RGBA")
+            options = {"quality": 80, "method": 6}
+
+        output = io.BytesIO()
+        image.save(output, variant.format, **options)
+        return output.getvalue()
+
+    @staticmethod
+    def make_logo_variants(content: bytes) -> dict[str, bytes]:
+        """
+        Scales an uploaded logo down to each variant's bounding box and re-encodes it.
+        Raises if the content is not an image Pillow can read.
+        """
+        with Image.open(io.BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+        return {
+            name: ImageService.render_variant(image, variant)
+            for name, variant in LOGO_VARIANTS.items()
+        }
+
+    @staticmethod
+    async def store_logo_variants(key: str, variants: dict[str, bytes]) -> list[str]:
+        """
+        Stores the variants of an uploaded logo next to it. Returns their keys.
+        """
+        return await asyncio.gather(*(
+            storage_service.upload_stream(
+                data, ImageService.variant_key(key, name), content_type=LOGO_VARIANTS[name].content_type
+            )
+            for name, data in variants.items()
+        ))
+
+    @staticmethod
+    def logo_keys(key: str) -> list[str]:
+        """
+        The uploaded file and its variants, e.g. to delete them together.
+        """
+        key = ImageService.original_key(key)
+        return [key] + [ImageService.variant_key(key, name) for name in LOGO_VARIANTS]
+
+    @staticmethod
+    def _load_logo(key: str) -> LogoImage:
+        data = b"".join(storage_service.open_stream(key))
+        digest = hashlib.sha256(data).hexdigest()
+        ImageService._logo_hashes.set(key, digest)
+
+        logo = ImageService._logos.get(digest)
+        if logo is None:
+            with Image.open(io.BytesIO(data)) as image:
+                logo = LogoImage(data, image.width, image.height)
+            ImageService._logos.set(digest, logo)
+        return logo
+
+    @staticmethod
+    async def pdf_logo(key: Optional[str]) -> Optional[LogoImage]:
+        """
+        The PDF variant of a logo, for the document renderers. Falls back to the uploaded
+        file for logos stored before variants existed. Returns None if it cannot be read.
+        """
+        if not key:
+            return None
+        key = ImageService.original_key(key)
+
+        for candidate in (ImageService.variant_key(key, "pdf"), key):
+            digest = ImageService._logo_hashes.get(candidate)
+            logo = ImageService._logos.get(digest) if digest else None
+            if logo is not None:
+                return logo
+            try:
+                return await asyncio.to_thread(ImageService._load_logo, candidate)
+            except Exception:
+                continue
+        logger.warning("Cannot load logo %s", key)
+        return None
@@ -1,13 +1,19 @@
+import time
 import pandas as pd
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from fastapi import UploadFile
 from app.models.auction import Auction, AuctionStatus
 from app.models.actor import Actor, ActorType
+from app.core import metrics
+from app.core.tracing import child_span, current_span, traced
 from app.models.lot import Lot, LotStatus
+from app.services.actor_service import ActorService
+from app.services.version_service import VersionService
 
 class ImportService:
     @staticmethod
+    @traced("import.create_auction", root=False)
     async def create_auction_from_excel(db: AsyncSession, file: UploadFile, filename: str) -> tuple[Auction, list[dict]]:
         # 1. Create Auction
         auction = Auction(name=filename, status=AuctionStatus.MAPPED)
@@ -15,13 +21,17 @@ class ImportService:
         await db.flush()  # Get ID
         
         # 2. Parse Excel
-        df = pd.read_excel(file.file)
+        start = time.perf_counter()
+        with child_span("import.parse_excel"):
+            df = pd.read_excel(file.file)
+        current_span().set_attribute("rows", len(df))
         
         # Expected columns: Lot, Vendeur, Désignation
         # Normalize columns just in case
         df.columns = [c.strip() for c in df.columns]
         
         imported_items = []
+        created_sellers = {} # name -> id, for sellers this transaction creates
         for _, row in df.iterrows():
             lot_number = row.get("Lot")
             seller_name = row.get("Vendeur")
@@ -31,20 +41,20 @@ class ImportService:
                 continue
                 
             # 3. Get or Create Seller
-            result = await db.execute(select(Actor).where(Actor.name == seller_name, Actor.type == ActorType.SELLER))
-            seller = result.scalars().first()
+            seller_id = created_sellers.get(seller_name) or await ActorService.find_id(db, ActorType.SELLER, name=seller_name)
             
-            if not seller:
+            if not seller_id:
                 seller = Actor(name=seller_name, type=ActorType.SELLER)
                 db.add(seller)
                 await db.flush()
+                seller_id = created_sellers[seller_name] = seller.id
             
             # 4. Create Lot
             lot = Lot(
                 auction_id=auction.id,
                 lot_number=int(lot_number),
                 description=description,
-                seller_id=seller.id,
+                seller_id=seller_id,
                 status=LotStatus.CREATED
             )
             db.add(lot)
@@ -55,11 +65,14 @@ class ImportService:
                 "seller_name": seller_name
             })
             
-        await db.commit()
+        with child_span("db.commit"):
+            await db.commit()
+        metrics.record_rows("import", len(df), time.perf_counter() - start)
         await db.refresh(auction)
         return auction, imported_items
 
     @staticmethod
+    @traced("import.import_mapping", "auction_id", root=False)
     async def import_mapping_for_auction(db: AsyncSession, auction_id: int, file: UploadFile) -> tuple[Auction, list[dict]]:
         # 1. Get Auction
         result = await db.execute(select(Auction).where(Auction.id == auction_id))
@@ -67,15 +80,23 @@ class ImportService:
         
         if not auction:
             raise ValueError(f"Auction with ID {auction_id} not found")
+
+        # Existing lots in one statement rather than one lookup per row
+        result = await db.execute(select(Lot).where(Lot.auction_id == auction.id))
+        existing_lots = {lot.lot_number: lot for lot in result.scalars().all()}
             
         # 2. Parse Excel
-        df = pd.read_excel(file.file)
+        start = time.perf_counter()
+        with child_span("import.parse_excel"):
+            df = pd.read_excel(file.file)
+        current_span().set_attribute("rows", len(df))
         
         # Expected columns: Lot, Vendeur, Désignation
         # Normalize columns just in case
         df.columns = [c.strip() for c in df.columns]
         
         imported_items = []
+        created_sellers = {} # name -> id, for sellers this transaction creates
         for _, row in df.iterrows():
             lot_number = row.get("Lot")
             seller_name = row.get("Vendeur")
@@ -85,22 +106,21 @@ class ImportService:
                 continue
                 
             # 3. Get or Create Seller
-            result = await db.execute(select(Actor).where(Actor.name == seller_name, Actor.type == ActorType.SELLER))
-            seller = result.scalars().first()
+            seller_id = created_sellers.get(seller_name) or await ActorService.find_id(db, ActorType.SELLER, name=seller_name)
             
-            if not seller:
+            if not seller_id:
                 seller = Actor(name=seller_name, type=ActorType.SELLER)
                 db.add(seller)
                 await db.flush()
+                seller_id = created_sellers[seller_name] = seller.id
             
             # 4. Check if Lot exists
-            result = await db.execute(select(Lot).where(Lot.auction_id == auction.id, Lot.lot_number == int(lot_number)))
-            existing_lot = result.scalars().first()
+            existing_lot = existing_lots.get(int(lot_number))
             
             if existing_lot:
                 # Update existing lot
                 existing_lot.description = description
-                existing_lot.seller_id = seller.id
+                existing_lot.seller_id = seller_id
                 # existing_lot.status = LotStatus.CREATED # Keep status or reset? Let's keep it.
             else:
                 # Create Lot
@@ -108,10 +128,11 @@ class ImportService:
                     auction_id=auction.id,
                     lot_number=int(lot_number),
                     description=description,
-                    seller_id=seller.id,
+                    seller_id=seller_id,
                     status=LotStatus.CREATED
                 )
                 db.add(lot)
+                existing_lots[lot.lot_number] = lot # A repeated lot number updates this one
             
             imported_items.append({
                 "lot_number": int(lot_number),
@@ -122,7 +143,10 @@ class ImportService:
         # Update Auction Status if needed
         if auction.status == AuctionStatus.CREATED:
             auction.status = AuctionStatus.MAPPED
-            
-        await db.commit()
+
+        await VersionService.bump_auctions(db, auction.id)
+        with child_span("db.commit"):
+            await db.commit()
+        metrics.record_rows("import", len(df), time.perf_counter() - start)
         await db.refresh(auction)
         return auction, imported_items
@@ -1,42 +1,55 @@
 import pandas as pd
 import io
+import time
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased
 from fastapi import UploadFile
 from fastapi.responses import StreamingResponse
+from app.core import metrics
+from app.core.serialization import rows_to_dicts
+from app.core.tracing import child_span, current_span, traced
 from app.models.auction import Auction
 from app.models.actor import Actor, ActorType
 from app.models.lot import Lot, LotStatus
+from app.services.actor_service import ActorService
+from app.services.version_service import VersionService
 
 class ReconciliationService:
     @staticmethod
+    @traced("reconciliation.reconcile", "auction_id", root=False)
     async def reconcile_auction(db: AsyncSession, auction_id: int, file: UploadFile):
         # 1. Load DB Lots
-        result = await db.execute(select(Lot).where(Lot.auction_id == auction_id))
-        db_lots = {lot.lot_number: lot for lot in result.scalars().all()}
+        start = time.perf_counter()
+        with child_span("reconciliation.load_lots"):
+            result = await db.execute(select(Lot).where(Lot.auction_id == auction_id))
+            db_lots = {lot.lot_number: lot for lot in result.scalars().all()}
         
         # 2. Parse CSV
         # Handle encoding and separator issues similar to analysis script
         content = await file.read()
-        try:
-            df = pd.read_csv(pd.io.common.BytesIO(content), encoding='utf-8')
-        except:
+        with child_span("reconciliation.parse_csv", bytes=len(content)):
             try:
-                df = pd.read_csv(pd.io.common.BytesIO(content), encoding='latin-1', sep=';')
+                df = pd.read_csv(pd.io.common.BytesIO(content), encoding='utf-8')
             except:
-                df = pd.read_csv(pd.io.common.BytesIO(content), encoding='cp1252', sep=';')
-        
-        if len(df.columns) <= 1:
-             try:
-                df = pd.read_csv(pd.io.common.BytesIO(content), encoding='latin-1', sep=';')
-             except:
-                pass
+                try:
+                    df = pd.read_csv(pd.io.common.BytesIO(content), encoding='latin-1', sep=';')
+                except:
+                    df = pd.read_csv(pd.io.common.BytesIO(content), encoding='cp1252', sep=';')
+            
+            if len(df.columns) <= 1:
+                 try:
+                    df = pd.read_csv(pd.io.common.BytesIO(content), encoding='latin-1', sep=';')
+                 except:
+                    pass
+        current_span().set_attribute("rows", len(df))
 
         # Normalize columns
         df.columns = [c.strip() for c in df.columns]
         
         processed_lot_numbers = set()
+        created_buyers = {} # ("email" | "name", value) -> id, for buyers this transaction creates
         
         for _, row in df.iterrows():
             lot_number = row.get("Lot")
@@ -53,7 +66,7 @@ class ReconciliationService:
             buyer_address = row.get("Adresse")
             
             # 3. Get or Create Buyer
-            buyer = None
+            buyer_id = None
             
             # Extract additional fields
             buyer_zip = row.get("CP")
@@ -83,21 +96,19 @@ class ReconciliationService:
 
             if buyer_email and pd.notna(buyer_email):
                 # Try to find by Email first
-                result = await db.execute(select(Actor).where(Actor.email == buyer_email, Actor.type == ActorType.BUYER))
-                buyer = result.scalars().first()
+                buyer_id = created_buyers.get(("email", buyer_email)) or await ActorService.find_id(db, ActorType.BUYER, email=buyer_email)
 
-            if not buyer and (buyer_code or buyer_name):
+            if not buyer_id and (buyer_code or buyer_name):
                 # Fallback to Name if Email didn't match or wasn't present
                 full_name = f"{buyer_name} {buyer_firstname}".strip()
                 if not full_name:
                     full_name = str(buyer_code)
                 
                 # If we didn't search by email (or failed), search by name
-                if not buyer:
-                     result = await db.execute(select(Actor).where(Actor.name == full_name, Actor.type == ActorType.BUYER))
-                     buyer = result.scalars().first()
+                if not buyer_id:
+                     buyer_id = created_buyers.get(("name", full_name)) or await ActorService.find_id(db, ActorType.BUYER, name=full_name)
                 
-                if not buyer:
+                if not buyer_id:
                     buyer = Actor(
                         name=full_name, 
                         type=ActorType.BUYER,
@@ -108,6 +119,9 @@ class ReconciliationService:
                     )
                     db.add(buyer)
                     await db.flush()
+                    buyer_id = created_buyers[("name", full_name)] = buyer.id
+                    if buyer.email:
+                        created_buyers[("email", buyer.email)] = buyer.id
             
             # Update existing buyer info if needed? 
             # User said "if it do not exists it creates it... before linking". 
@@ -123,8 +137,8 @@ class ReconciliationService:
                 lot = db_lots[lot_number]
                 lot.status = LotStatus.SOLD
                 lot.hammer_price = int(price) if pd.notna(price) else 0
-                if buyer:
-                    lot.buyer_id = buyer.id
+                if buyer_id:
+                    lot.buyer_id = buyer_id
             else:
                 # ANOMALIE (Lot in CSV but not in DB)
                 # We need to create it, but it has no seller from mapping.
@@ -135,7 +149,7 @@ class ReconciliationService:
                     lot_number=lot_number,
                     description=row.get("Description"),
                     hammer_price=int(price) if pd.notna(price) else 0,
-                    buyer_id=buyer.id if buyer else None,
+                    buyer_id=buyer_id,
                     seller_id=None, # No seller known
                     status=LotStatus.ANOMALIE
                 )
@@ -145,8 +159,11 @@ class ReconciliationService:
         for lot_num, lot in db_lots.items():
             if lot_num not in processed_lot_numbers:
                 lot.status = LotStatus.UNSOLD
-        
-        await db.commit()
+
+        await VersionService.bump_auctions(db, auction_id)
+        with child_span("db.commit"):
+            await db.commit()
+        metrics.record_rows("reconciliation", len(df), time.perf_counter() - start)
         
         # Return stats
         return {
@@ -157,8 +174,24 @@ class ReconciliationService:
         }
 
     @staticmethod
+    @traced("reconciliation.results", root=False)
     async def get_results(db: AsyncSession, auction_id: int, status: str = None, seller_name: str = None):
-        query = select(Lot).options(joinedload(Lot.seller), joinedload(Lot.buyer)).where(Lot.auction_id == auction_id)
+        # Plain column rows: no ORM objects for thousands of lots
+        seller = aliased(Actor)
+        buyer = aliased(Actor)
+        query = (
+            select(
+                Lot.lot_number,
+                Lot.description,
+                func.coalesce(seller.name, "Inconnu").label("seller_name"),
+                Lot.status,
+                Lot.hammer_price,
+                buyer.name.label("buyer_name"),
+            )
+            .outerjoin(seller, seller.id == Lot.seller_id)
+            .outerjoin(buyer, buyer.id == Lot.buyer_id)
+            .where(Lot.auction_id == auction_id)
+        )
         
         if status:
             if status == "SOLD":
@@ -168,26 +201,11 @@ class ReconciliationService:
             elif status == "ANOMALIE":
                 query = query.where(Lot.status == LotStatus.ANOMALIE)
                 
-        # For seller filtering, we need to join with Actor (seller)
-        # But Lot.seller is a relationship.
         if seller_name:
-            query = query.join(Lot.seller).where(Actor.name.ilike(f"%{seller_name}%"))
+            query = query.where(seller.name.ilike(f"%{seller_name}%"))
             
         result = await db.execute(query.order_by(Lot.lot_number))
-        lots = result.scalars().all()
-        
-        results = []
-        for lot in lots:
-            results.append({
-                "lot_number": lot.lot_number,
-                "description": lot.description,
-                "seller_name": lot.seller.name if lot.seller else "Inconnu",
-                "status": lot.status,
-                "hammer_price": lot.hammer_price,
-                "buyer_name": lot.buyer.name if lot.buyer else None
-            })
-            
-        return results
+        return rows_to_dicts(result)
 
     @staticmethod
     async def export_results(db: AsyncSession, auction_id: int, status: str = None, seller_name: str = None):
@@ -215,7 +233,7 @@ class ReconciliationService:
         
         # 3. Export to Excel
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with child_span("reconciliation.write_xlsx", rows=len(df)), pd.ExcelWriter(output, engine='openpyxl') as writer:
             df.to_excel(writer, index=False, sheet_name='Résultats')
             # Auto-adjust columns width (simplified for openpyxl if needed, or skip)
             # Openpyxl auto-width is a bit more manual, skipping for now to keep it simple
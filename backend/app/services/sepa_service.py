@@ -1,105 +1,311 @@
 from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, NamedTuple, Optional
+import gzip
+import io
 import uuid
+from lxml import etree
+from app.core.config import settings
+from app.core.tracing import child_span, traced
+from app.models.settlement_batch import SettlementBatch
+from app.services.bank_validation_service import BankValidationService
+
+PAIN_001_NS = "urn:iso:std:iso:20022:tech:xsd:pain.001.001.03"
+
+# Flush the writer every N transactions when streaming
+STREAM_FLUSH_EVERY = 100
+# Unstructured remittance information (RmtInf/Ustrd) limit
+MAX_REMITTANCE_LENGTH = 140
+
+class SEPADebtor(NamedTuple):
+    name: str
+    iban: str
+    bic: str
+
+# Debtor (Auction House) until the company settings are saved - Mocked
+DEFAULT_DEBTOR = SEPADebtor("AUCTIFY FRANCE", "FR7630006000011234567890189", "BNPARFXX")
+
+class SEPATransaction(NamedTuple):
+    end_to_end_id: str
+    amount: Decimal
+    creditor_name: str
+    creditor_iban: str
+    creditor_bic: Optional[str] # Optional for SEPA transfers: CdtrAgt is omitted without it
+    remittance_info: str
+
+class SEPAPaymentBlock:
+    """
+    One <PmtInf> block: a group of transfers sharing debtor and execution date.
+    """
+    def __init__(self):
+        self.payment_info_id = f"PMT-{uuid.uuid4().hex[:16].upper()}"
+        self.transactions = []
+        self.ctrl_sum = Decimal("0")
+
+    @property
+    def nb_of_txs(self) -> int:
+        return len(self.transactions)
+
+class SEPAFile:
+    """
+    One pain.001 document. Counts and control sums are accumulated as
+    transactions are added, so the group header is known before writing.
+    """
+    def __init__(self, max_txs_per_block: Optional[int] = None, debtor: Optional[SEPADebtor] = None):
+        self.message_id = f"MSG-{uuid.uuid4().hex[:16].upper()}"
+        self.max_txs_per_block = max_txs_per_block
+        self.debtor = debtor or DEFAULT_DEBTOR
+        self.blocks = []
+        self.nb_of_txs = 0
+        self.ctrl_sum = Decimal("0")
+
+    def add(self, transaction: SEPATransaction):
+        if not self.blocks or (self.max_txs_per_block and self.blocks[-1].nb_of_txs >= self.max_txs_per_block):
+            self.blocks.append(SEPAPaymentBlock())
+        block = self.blocks[-1]
+        block.transactions.append(transaction)
+        block.ctrl_sum += transaction.amount
+        self.nb_of_txs += 1
+        self.ctrl_sum += transaction.amount
+
+def _element(tag: str, text=None, **attrib) -> etree._Element:
+    element = etree.Element(tag, **attrib)
+    if text is not None:
+        element.text = str(text)
+    return element
+
+def _sub(parent, tag: str, text=None, **attrib) -> etree._Element:
+    element = etree.SubElement(parent, tag, **attrib)
+    if text is not None:
+        element.text = str(text)
+    return element
+
+def _path(parent, tags: str, text) -> etree._Element:
+    """
+    Creates nested elements, e.g. _path(el, "DbtrAcct/Id/IBAN", iban).
+    """
+    *containers, leaf = tags.split("/")
+    for tag in containers:
+        parent = _sub(parent, tag)
+    return _sub(parent, leaf, text)
 
 class SEPAService:
     @staticmethod
-    def generate_sepa_xml(settlements: list, execution_date: datetime = None) -> str:
+    def debtor_for(company) -> SEPADebtor:
+        """
+        The auction house account paying the sellers, from the company settings snapshot.
+        """
+        if not company:
+            return DEFAULT_DEBTOR
+        return SEPADebtor(
+            company.name,
+            BankValidationService.normalize(company.iban),
+            BankValidationService.normalize(company.bic),
+        )
+
+    @staticmethod
+    def to_amount(value) -> Decimal:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+
+    @staticmethod
+    def build_transaction(end_to_end_id: str, amount, creditor_name: str, creditor_iban: str, creditor_bic: str, remittance_info: str) -> SEPATransaction:
+        # Bank details are validated upstream (BankValidationService); no fallback account
+        return SEPATransaction(
+            end_to_end_id=end_to_end_id,
+            amount=SEPAService.to_amount(amount),
+            creditor_name=creditor_name,
+            creditor_iban=BankValidationService.normalize(creditor_iban),
+            creditor_bic=BankValidationService.normalize(creditor_bic) or None,
+            remittance_info=remittance_info,
+        )
+
+    @staticmethod
+    def remittance_breakdown(label: str, entries: list[str]) -> str:
+        """
+        "<label> - <entry>; <entry>" with as many whole entries as fit in the
+        remittance limit, then "+k autres" for the entries left out.
+        """
+        def others(count: int) -> str:
+            return f" +{count} autre{'s' if count > 1 else ''}" if count else ""
+
+        text = label
+        for i, entry in enumerate(entries):
+            candidate = f"{text}{'; ' if i else ' - '}{entry}"
+            if len(candidate) + len(others(len(entries) - i - 1)) > MAX_REMITTANCE_LENGTH:
+                # No room for this entry: say how many are missing instead
+                return f"{text}{others(len(entries) - i)}"[:MAX_REMITTANCE_LENGTH]
+            text = candidate
+        return text
+
+    @staticmethod
+    def transaction_for_settlement(settlement) -> SEPATransaction:
+        return SEPAService.build_transaction(
+            f"SET-{settlement.id}",
+            settlement.amount,
+            settlement.seller.name,
+            settlement.seller.iban,
+            settlement.seller.bic,
+            f"Vente {settlement.auction.name} - Reglement Vendeur",
+        )
+
+    @staticmethod
+    def split_transactions(
+        transactions: Iterable[SEPATransaction],
+        max_txs_per_file: Optional[int] = None,
+        max_amount_per_file: Optional[float] = None,
+        max_txs_per_block: Optional[int] = None,
+        debtor: Optional[SEPADebtor] = None,
+    ) -> list[SEPAFile]:
         """
-        Generates a PAIN.001.001.03 XML file for the given settlements.
+        Distributes transactions over as many files as the limits require, in a single pass.
+        A transaction larger than max_amount_per_file still gets a file of its own.
+        """
+        max_txs_per_file = max_txs_per_file if max_txs_per_file is not None else settings.SEPA_MAX_TXS_PER_FILE
+        max_amount_per_file = max_amount_per_file if max_amount_per_file is not None else settings.SEPA_MAX_AMOUNT_PER_FILE
+        max_txs_per_block = max_txs_per_block if max_txs_per_block is not None else settings.SEPA_MAX_TXS_PER_PMTINF
+        max_amount = SEPAService.to_amount(max_amount_per_file) if max_amount_per_file else None
+
+        files = []
+        current = None
+        for transaction in transactions:
+            if (
+                current is None
+                or (max_txs_per_file and current.nb_of_txs >= max_txs_per_file)
+                or (max_amount and current.ctrl_sum + transaction.amount > max_amount)
+            ):
+                current = SEPAFile(max_txs_per_block, debtor)
+                files.append(current)
+            current.add(transaction)
+        return files
+
+    @staticmethod
+    def _group_header(sepa_file: SEPAFile) -> etree._Element:
+        header = _element("GrpHdr")
+        _sub(header, "MsgId", sepa_file.message_id)
+        _sub(header, "CreDtTm", datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"))
+        _sub(header, "NbOfTxs", sepa_file.nb_of_txs)
+        _sub(header, "CtrlSum", f"{sepa_file.ctrl_sum:.2f}")
+        _path(header, "InitgPty/Nm", sepa_file.debtor.name[:70])
+        return header
+
+    @staticmethod
+    def _payment_block_header(block: SEPAPaymentBlock, execution_date: datetime, debtor: SEPADebtor) -> list:
+        pmt_tp_inf = _element("PmtTpInf")
+        _path(pmt_tp_inf, "SvcLvl/Cd", "SEPA")
+        dbtr = _element("Dbtr")
+        _sub(dbtr, "Nm", debtor.name[:70])
+        dbtr_acct = _element("DbtrAcct")
+        _path(dbtr_acct, "Id/IBAN", debtor.iban)
+        dbtr_agt = _element("DbtrAgt")
+        if debtor.bic:
+            _path(dbtr_agt, "FinInstnId/BIC", debtor.bic)
+        else:
+            # DbtrAgt is mandatory: without a BIC the bank is identified by the IBAN (EPC)
+            _path(dbtr_agt, "FinInstnId/Othr/Id", "NOTPROVIDED")
+
+        return [
+            _element("PmtInfId", block.payment_info_id),
+            _element("PmtMtd", "TRF"),
+            _element("NbOfTxs", block.nb_of_txs),
+            _element("CtrlSum", f"{block.ctrl_sum:.2f}"),
+            pmt_tp_inf,
+            _element("ReqdExctnDt", execution_date.strftime("%Y-%m-%d")),
+            dbtr,
+            dbtr_acct,
+            dbtr_agt,
+            _element("ChrgBr", "SLEV"),
+        ]
+
+    @staticmethod
+    def _transaction(transaction: SEPATransaction) -> etree._Element:
+        tx = _element("CdtTrfTxInf")
+        _path(tx, "PmtId/EndToEndId", transaction.end_to_end_id)
+        _path(tx, "Amt/InstdAmt", f"{transaction.amount:.2f}").set("Ccy", "EUR")
+        if transaction.creditor_bic:
+            _path(tx, "CdtrAgt/FinInstnId/BIC", transaction.creditor_bic)
+        _path(tx, "Cdtr/Nm", transaction.creditor_name[:70])
+        _path(tx, "CdtrAcct/Id/IBAN", transaction.creditor_iban)
+        _path(tx, "RmtInf/Ustrd", transaction.remittance_info[:MAX_REMITTANCE_LENGTH])
+        return tx
+
+    @staticmethod
+    def iter_xml(sepa_file: SEPAFile, execution_date: datetime = None):
+        """
+        Serializes a SEPA file incrementally with lxml, yielding bytes as they are produced.
+        Text is escaped by the serializer.
         """
         if not execution_date:
             execution_date = datetime.utcnow()
-            
-        msg_id = f"MSG-{uuid.uuid4().hex[:16].upper()}"
-        cre_dt_tm = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
-        nb_of_txs = len(settlements)
-        ctrl_sum = sum(s.amount for s in settlements)
-        
-        # Group by Auction? Or just one Payment Information block?
-        # Let's assume one Payment Information block for simplicity.
-        pmt_inf_id = f"PMT-{uuid.uuid4().hex[:16].upper()}"
-        reqd_exctn_dt = execution_date.strftime("%Y-%m-%d")
-        
-        # Debtor (Auction House) Info - Mocked
-        debtor_name = "AUCTIFY FRANCE"
-        debtor_iban = "FR7630006000011234567890189"
-        debtor_bic = "BNPARFXX"
-        
-        xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Document xmlns="urn:iso:std:iso:20022:tech:xsd:pain.001.001.03">
-  <CstmrCdtTrfInitn>
-    <GrpHdr>
-      <MsgId>{msg_id}</MsgId>
-      <CreDtTm>{cre_dt_tm}</CreDtTm>
-      <NbOfTxs>{nb_of_txs}</NbOfTxs>
-      <CtrlSum>{ctrl_sum:.2f}</CtrlSum>
-      <InitgPty>
-        <Nm>{debtor_name}</Nm>
-      </InitgPty>
-    </GrpHdr>
-    <PmtInf>
-      <PmtInfId>{pmt_inf_id}</PmtInfId>
-      <PmtMtd>TRF</PmtMtd>
-      <NbOfTxs>{nb_of_txs}</NbOfTxs>
-      <CtrlSum>{ctrl_sum:.2f}</CtrlSum>
-      <PmtTpInf>
-        <SvcLvl>
-          <Cd>SEPA</Cd>
-        </SvcLvl>
-      </PmtTpInf>
-      <ReqdExctnDt>{reqd_exctn_dt}</ReqdExctnDt>
-      <Dbtr>
-        <Nm>{debtor_name}</Nm>
-      </Dbtr>
-      <DbtrAcct>
-        <Id>
-          <IBAN>{debtor_iban}</IBAN>
-        </Id>
-      </DbtrAcct>
-      <DbtrAgt>
-        <FinInstnId>
-          <BIC>{debtor_bic}</BIC>
-        </FinInstnId>
-      </DbtrAgt>
-      <ChrgBr>SLEV</ChrgBr>
-"""
-
-        for settlement in settlements:
-            end_to_end_id = f"SET-{settlement.id}"
-            remittance_info = f"Vente {settlement.auction.name} - Reglement Vendeur"
-            
-            # Use Seller IBAN/BIC or fallback
-            creditor_iban = settlement.seller.iban or "FR7630006000011234567890189" # Fallback for demo
-            creditor_bic = settlement.seller.bic or "BNPARFXX" # Fallback for demo
-            
-            xml += f"""      <CdtTrfTxInf>
-        <PmtId>
-          <EndToEndId>{end_to_end_id}</EndToEndId>
-        </PmtId>
-        <Amt>
-          <InstdAmt Ccy="EUR">{settlement.amount:.2f}</InstdAmt>
-        </Amt>
-        <CdtrAgt>
-          <FinInstnId>
-            <BIC>{creditor_bic}</BIC>
-          </FinInstnId>
-        </CdtrAgt>
-        <Cdtr>
-          <Nm>{settlement.seller.name}</Nm>
-        </Cdtr>
-        <CdtrAcct>
-          <Id>
-            <IBAN>{creditor_iban}</IBAN>
-          </Id>
-        </CdtrAcct>
-        <RmtInf>
-          <Ustrd>{remittance_info}</Ustrd>
-        </RmtInf>
-      </CdtTrfTxInf>
-"""
-
-        xml += """    </PmtInf>
-  </CstmrCdtTrfInitn>
-</Document>"""
-        
-        return xml
+
+        buffer = io.BytesIO()
+
+        def drain() -> bytes:
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return data
+
+        with etree.xmlfile(buffer, encoding="UTF-8") as xf:
+            xf.write_declaration()
+            # Unqualified tags under a literal default namespace keep the output prefix-free
+            with xf.element("Document", xmlns=PAIN_001_NS):
+                with xf.element("CstmrCdtTrfInitn"):
+                    xf.write(SEPAService._group_header(sepa_file))
+                    for block in sepa_file.blocks:
+                        with xf.element("PmtInf"):
+                            for element in SEPAService._payment_block_header(block, execution_date, sepa_file.debtor):
+                                xf.write(element)
+                            for index, transaction in enumerate(block.transactions, 1):
+                                xf.write(SEPAService._transaction(transaction))
+                                if index % STREAM_FLUSH_EVERY == 0:
+                                    xf.flush()
+                                    yield drain()
+        yield drain()
+
+    @staticmethod
+    def write_xml(sepa_file: SEPAFile, output, execution_date: datetime = None):
+        """
+        Writes a SEPA file to a binary file object without building it in memory.
+        """
+        for chunk in SEPAService.iter_xml(sepa_file, execution_date):
+            output.write(chunk)
+
+    @staticmethod
+    @traced("sepa.build_batches", root=False)
+    def build_batches(
+        transactions: Iterable[SEPATransaction],
+        execution_date: datetime = None,
+        max_txs_per_file: Optional[int] = None,
+        max_amount_per_file: Optional[float] = None,
+        debtor: Optional[SEPADebtor] = None,
+    ) -> list[tuple[SettlementBatch, list[SEPATransaction]]]:
+        """
+        Generates the SEPA files for the transactions, split at the configured limits
+        unless overridden. Each file becomes a SettlementBatch holding the XML once,
+        gzipped while it is written. Returns (batch, transactions paid by that batch) pairs.
+        """
+        batches = []
+        for sepa_file in SEPAService.split_transactions(transactions, max_txs_per_file, max_amount_per_file, debtor=debtor):
+            compressed = io.BytesIO()
+            with child_span("sepa.write_file", nb_of_txs=sepa_file.nb_of_txs), gzip.GzipFile(fileobj=compressed, mode="wb") as output:
+                SEPAService.write_xml(sepa_file, output, execution_date)
+
+            batch = SettlementBatch(
+                message_id=sepa_file.message_id,
+                nb_of_txs=sepa_file.nb_of_txs,
+                control_sum=float(sepa_file.ctrl_sum),
+                xml_gz=compressed.getvalue(),
+            )
+            paid = [transaction for block in sepa_file.blocks for transaction in block.transactions]
+            batches.append((batch, paid))
+        return batches
+
+    @staticmethod
+    def generate_sepa_xml(settlements: list, execution_date: datetime = None, debtor: Optional[SEPADebtor] = None) -> str:
+        """
+        Generates a PAIN.001.001.03 XML file for the given settlements, as a single file.
+        """
+        transactions = [SEPAService.transaction_for_settlement(s) for s in settlements]
+        files = SEPAService.split_transactions(transactions, max_txs_per_file=0, max_amount_per_file=0, debtor=debtor)
+        sepa_file = files[0] if files else SEPAFile(debtor=debtor)
+        return b"".join(SEPAService.iter_xml(sepa_file, execution_date)).decode("utf-8")
@@ -0,0 +1,263 @@
+import asyncio
+from datetime import datetime
+from itertools import groupby
+from typing import Optional
+from sqlalchemy import Numeric, cast, exists, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.actor import Actor
+from app.models.auction import Auction
+from app.models.lot import Lot, LotStatus
+from app.models.settlement import Settlement, SettlementStatus
+from app.services.bank_validation_service import BankValidationService
+from app.services.company_service import CompanyService
+from app.services.sepa_service import SEPADebtor, SEPAService
+from app.services.storage_service import storage_service
+from app.services.vat_service import VATService
+from app.services.version_service import VersionService
+
+# Transaction-level advisory lock serializing settlement runs (per auction and
+# consolidated), so two overlapping runs cannot both see the same sellers as unsettled
+SETTLEMENT_RUN_LOCK = 0x5E771E
+
+class SettlementService:
+    @staticmethod
+    def seller_totals(*criteria):
+        """
+        Net amount due per seller and auction, computed by the database:
+        hammer total, seller fees at the auction rate and VAT on those fees.
+        Seller bank details come from the same statement.
+        """
+        hammer_total = func.sum(func.coalesce(Lot.hammer_price, 0))
+        seller_fees = func.round(cast(hammer_total * Auction.seller_fee_rate, Numeric), 2)
+        seller_fees_vat = func.round(seller_fees * cast(VATService.FEES_VAT_RATE, Numeric), 2)
+
+        return (
+            select(
+                Lot.seller_id,
+                Lot.auction_id,
+                Auction.name.label("auction_name"),
+                func.coalesce(Auction.number, Auction.name).label("auction_label"),
+                hammer_total.label("hammer_total"),
+                seller_fees.label("seller_fees"),
+                seller_fees_vat.label("seller_fees_vat"),
+                (hammer_total - seller_fees - seller_fees_vat).label("amount"),
+                Actor.name.label("seller_name"),
+                Actor.iban,
+                Actor.bic,
+                Actor.iban_hash,
+                Actor.iban_valid,
+            )
+            .join(Auction, Auction.id == Lot.auction_id)
+            .join(Actor, Actor.id == Lot.seller_id)
+            .where(Lot.status == LotStatus.SOLD, Lot.seller_id.isnot(None), *criteria)
+            # Grouping by primary keys lets the auction and actor columns be selected as-is
+            .group_by(Lot.seller_id, Lot.auction_id, Auction.id, Actor.id)
+            .order_by(Lot.seller_id, Lot.auction_id)
+        )
+
+    @staticmethod
+    def unsettled():
+        """
+        Criterion for seller_totals: sellers not settled yet for the auction, by a
+        per-auction run or an earlier consolidated run.
+        """
+        return ~exists().where(
+            Settlement.auction_id == Lot.auction_id,
+            Settlement.seller_id == Lot.seller_id,
+        )
+
+    @staticmethod
+    def consolidated_totals(*criteria):
+        """
+        Per seller and auction rows, plus the seller's total over all selected auctions.
+        """
+        per_auction = SettlementService.seller_totals(*criteria).subquery()
+
+        return (
+            select(
+                per_auction,
+                func.sum(per_auction.c.amount).over(partition_by=per_auction.c.seller_id).label("seller_amount"),
+            )
+            .order_by(per_auction.c.seller_id, per_auction.c.auction_id)
+        )
+
+    @staticmethod
+    async def _insert_settlements(db: AsyncSession, totals: list) -> list[int]:
+        """
+        Inserts one settlement per aggregated row in a single statement and returns
+        their ids in row order.
+        """
+        result = await db.execute(
+            insert(Settlement).returning(Settlement.id, sort_by_parameter_order=True),
+            [
+                {
+                    "auction_id": row.auction_id,
+                    "seller_id": row.seller_id,
+                    "hammer_total": float(row.hammer_total),
+                    "seller_fees": float(row.seller_fees),
+                    "seller_fees_vat": float(row.seller_fees_vat),
+                    "amount": float(row.amount),
+                    "status": SettlementStatus.CREATED,
+                }
+                for row in totals
+            ],
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def _store_batches(db: AsyncSession, debtor: SEPADebtor, transactions: list, settlement_ids: dict, **limits) -> list:
+        """
+        Writes the SEPA files to storage and links each settlement to the batch paying it.
+        `settlement_ids` maps a transaction's EndToEndId to the settlements it pays.
+        """
+        batches = SEPAService.build_batches(transactions, debtor=debtor, **limits)
+        # The gzipped files go to storage; the rows keep their keys
+        keys = await asyncio.gather(*(
+            storage_service.upload_stream(
+                batch.xml_gz, f"settlements/{batch.message_id}.xml.gz", content_type="application/gzip"
+            )
+            for batch, _ in batches
+        ))
+        for (batch, _), key in zip(batches, keys):
+            batch.storage_key = key
+            batch.xml_gz = None
+            db.add(batch)
+        await db.flush()
+
+        for batch, paid in batches:
+            ids = [settlement_id for transaction in paid for settlement_id in settlement_ids[transaction.end_to_end_id]]
+            await db.execute(
+                update(Settlement).where(Settlement.id.in_(ids)).values(batch_id=batch.id)
+            )
+        return [batch for batch, _ in batches]
+
+    @staticmethod
+    async def _check_bank_details(db: AsyncSession, debtor: SEPADebtor, totals: list) -> list[dict]:
+        """
+        Validates the paying account and every creditor before anything is written, so
+        a bad IBAN is reported here rather than by the bank rejecting the whole file.
+        """
+        errors = BankValidationService.validate_debtor(debtor.name, debtor.iban, debtor.bic)
+        errors += await BankValidationService.validate_creditors(db, totals)
+        if errors:
+            # Keep the refreshed validation cache even though the run stops
+            await db.commit()
+        return errors
+
+    @staticmethod
+    async def generate_for_auction(db: AsyncSession, auction_id: int):
+        """
+        Creates the settlements of an auction and their SEPA files, for the sellers
+        not settled yet by this or a consolidated run.
+        Returns None when there is nothing left to settle, or the bank detail errors
+        blocking the run.
+        """
+        await db.execute(select(func.pg_advisory_xact_lock(SETTLEMENT_RUN_LOCK)))
+        result = await db.execute(
+            SettlementService.seller_totals(Lot.auction_id == auction_id, SettlementService.unsettled())
+        )
+        totals = result.all()
+        if not totals:
+            return None
+
+        debtor = SEPAService.debtor_for(await CompanyService.get(db))
+        errors = await SettlementService._check_bank_details(db, debtor, totals)
+        if errors:
+            return {"errors": errors}
+
+        settlement_ids = await SettlementService._insert_settlements(db, totals)
+
+        transactions = []
+        ids_by_reference = {}
+        for row, settlement_id in zip(totals, settlement_ids):
+            transaction = SEPAService.build_transaction(
+                f"SET-{settlement_id}",
+                row.amount,
+                row.seller_name,
+                row.iban,
+                row.bic,
+                f"Vente {row.auction_name} - Reglement Vendeur",
+            )
+            transactions.append(transaction)
+            ids_by_reference[transaction.end_to_end_id] = [settlement_id]
+
+        batches = await SettlementService._store_batches(db, debtor, transactions, ids_by_reference)
+        await VersionService.bump_auctions(db, auction_id)
+        await db.commit()
+
+        return {
+            "settlements": len(settlement_ids),
+            "batches": batches,
+        }
+
+    @staticmethod
+    async def generate_consolidated(
+        db: AsyncSession,
+        auction_ids: Optional[list[int]] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ):
+        """
+        Settles several auctions in one run: one settlement per seller and auction,
+        but a single transfer per seller, in a single pain.001 file. Sellers already
+        settled for an auction are skipped, so overlapping runs never pay twice.
+        Returns None when there is nothing to settle, or the bank detail errors
+        blocking the run.
+        """
+        await db.execute(select(func.pg_advisory_xact_lock(SETTLEMENT_RUN_LOCK)))
+        criteria = [SettlementService.unsettled()]
+        if auction_ids:
+            criteria.append(Lot.auction_id.in_(auction_ids))
+        if date_from:
+            criteria.append(Auction.date >= date_from)
+        if date_to:
+            criteria.append(Auction.date <= date_to)
+
+        result = await db.execute(SettlementService.consolidated_totals(*criteria))
+        totals = result.all()
+        if not totals:
+            return None
+
+        debtor = SEPAService.debtor_for(await CompanyService.get(db))
+        errors = await SettlementService._check_bank_details(db, debtor, totals)
+        if errors:
+            return {"errors": errors}
+
+        settlement_ids = await SettlementService._insert_settlements(db, totals)
+
+        # Rows are ordered by seller: one transfer per run of rows of the same seller,
+        # with the per-auction amounts that fit in the remittance information
+        transactions = []
+        ids_by_reference = {}
+        for _, group in groupby(zip(totals, settlement_ids), key=lambda pair: pair[0].seller_id):
+            rows, ids = zip(*group)
+            row = rows[0]
+            remittance = SEPAService.remittance_breakdown(
+                "Reglement Vendeur",
+                [f"{r.auction_label}: {SEPAService.to_amount(r.amount)}" for r in rows],
+            )
+            transaction = SEPAService.build_transaction(
+                f"SET-{ids[0]}",
+                row.seller_amount,
+                row.seller_name,
+                row.iban,
+                row.bic,
+                remittance,
+            )
+            transactions.append(transaction)
+            ids_by_reference[transaction.end_to_end_id] = list(ids)
+
+        # PmtInf blocks still follow their limit, but the run stays one file
+        batches = await SettlementService._store_batches(
+            db, debtor, transactions, ids_by_reference, max_txs_per_file=0, max_amount_per_file=0
+        )
+        await VersionService.bump_auctions(db, *{row.auction_id for row in totals})
+        await db.commit()
+
+        return {
+            "settlements": len(settlement_ids),
+            "sellers": len(transactions),
+            "auctions": len({row.auction_id for row in totals}),
+            "batches": batches,
+        }
@@ -0,0 +1,429 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import quote, urlencode
+import boto3
+from botocore.config import Config
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+# S3 rejects multipart parts smaller than 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+LOCAL_CHUNK_SIZE = 1024 * 1024
+
+async def _aiter(iterable):
+    for item in iterable:
+        yield item
+
+async def iter_parts(source, part_size: int):
+    """
+    Yields parts of part_size bytes (the last one may be shorter) from bytes, an UploadFile,
+    a binary file object, or a sync/async iterable of byte chunks.
+    Sync iterables are consumed on the event loop and should not block.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = [bytes(source)]
+
+    read = getattr(source, "read", None)
+    if read is not None:
+        while True:
+            if asyncio.iscoroutinefunction(read):
+                part = await read(part_size)
+            else:
+                part = await asyncio.to_thread(read, part_size)
+            if not part:
+                return
+            yield part
+
+    chunks = source if hasattr(source, "__aiter__") else _aiter(source)
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+class StorageBackend(ABC):
+    """
+    Object storage interface. Keys are relative, "/"-separated paths.
+    """
+    name = "custom" # Metrics label
+
+    @abstractmethod
+    async def put(self, key: str, source, content_type: Optional[str] = None) -> str:
+        """
+        Stores a stream (see iter_parts for accepted sources) under `key` and returns the key.
+        """
+
+    @abstractmethod
+    def open_stream(self, key: str, chunk_size: int = 64 * 1024):
+        """
+        Opens an object and returns an iterator over its content.
+        Raises before any chunk is produced if the object cannot be read. Blocking.
+        """
+
+    @abstractmethod
+    async def delete(self, keys: list[str]) -> list[str]:
+        """
+        Deletes objects and returns the keys that could not be deleted.
+        """
+
+    @abstractmethod
+    def presign(self, key: str, expiration: int) -> str:
+        """
+        Returns a URL granting read access to the object for `expiration` seconds.
+        """
+
+    @abstractmethod
+    async def list(self, prefix: str = "") -> list[str]:
+        """
+        Returns the keys starting with `prefix`, sorted.
+        """
+
+class S3StorageBackend(StorageBackend):
+    """
+    Cloudflare R2 (S3 API) through boto3. Blocking calls run on a dedicated executor.
+    """
+    name = "s3"
+    def __init__(self):
+        # One client (thread-safe) with one connection pool, shared by every request.
+        # The executor is sized to the pool so a worker thread never waits for a connection.
+        self.s3_client = boto3.client(
+            's3',
+            endpoint_url=settings.R2_ENDPOINT,
+            aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+            region_name=settings.R2_REGION,
+            config=Config(
+                max_pool_connections=settings.STORAGE_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.STORAGE_CONNECT_TIMEOUT,
+                read_timeout=settings.STORAGE_READ_TIMEOUT,
+                retries={"max_attempts": 3, "mode": "standard"},
+                tcp_keepalive=True,
+            ),
+        )
+        self.bucket_name = settings.R2_BUCKET
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.STORAGE_MAX_POOL_CONNECTIONS, thread_name_prefix="storage"
+        )
+
+    async def _run(self, fn, *args, **kwargs):
+        """
+        Runs a blocking S3 call on the storage executor, off the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def put(self, key: str, source, content_type: Optional[str] = None, part_size: Optional[int] = None) -> str:
+        """
+        Uploads without holding the stream in memory: fixed-size parts are read one at
+        a time and sent concurrently with a multipart upload, at most
+        STORAGE_MULTIPART_CONCURRENCY at once. Sources that fit in one part use a single
+        put_object. A failed multipart upload is aborted so no orphaned parts are billed.
+        """
+        part_size = max(part_size or settings.STORAGE_MULTIPART_PART_SIZE, MIN_PART_SIZE)
+        extra = {"ContentType": content_type} if content_type else {}
+        parts = iter_parts(source, part_size)
+
+        first = await anext(parts, b"")
+        second = await anext(parts, None) if len(first) >= part_size else None
+        if second is None:
+            await self._run(self.s3_client.put_object, Bucket=self.bucket_name, Key=key, Body=first, **extra)
+            return key
+
+        upload = await self._run(self.s3_client.create_multipart_upload, Bucket=self.bucket_name, Key=key, **extra)
+        upload_id = upload["UploadId"]
+        # Acquired before a part is read: bounds the parts held in memory
+        slots = asyncio.Semaphore(settings.STORAGE_MULTIPART_CONCURRENCY)
+        errors = []
+        tasks = []
+
+        async def send(number: int, body: bytes) -> dict:
+            try:
+                response = await self._run(
+                    self.s3_client.upload_part,
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=body,
+                )
+                return {"PartNumber": number, "ETag": response["ETag"]}
+            except Exception as e:
+                errors.append(e)
+                raise
+            finally:
+                slots.release()
+
+        async def all_parts():
+            yield first
+            yield second
+            async for part in parts:
+                yield part
+
+        try:
+            number = 0
+            async for part in all_parts():
+                number += 1
+                await slots.acquire()
+                if errors:
+                    raise errors[0]
+                tasks.append(asyncio.create_task(send(number, part)))
+            completed = await asyncio.gather(*tasks)
+
+            await self._run(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": completed},
+            )
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await self._run(self.s3_client.abort_multipart_upload, Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+            except Exception as e:
+                logger.warning("Failed to abort multipart upload %s of %s: %s", upload_id, key, e)
+            raise
+        return key
+
+    def open_stream(self, key: str, chunk_size: int = 64 * 1024):
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        return response["Body"].iter_chunks(chunk_size=chunk_size)
+
+    async def delete(self, keys: list[str]) -> list[str]:
+        batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+
+        responses = await asyncio.gather(*(
+            self._run(
+                self.s3_client.delete_objects,
+                Bucket=self.bucket_name,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            for batch in batches
+        ), return_exceptions=True)
+
+        failed = []
+        for batch, response in zip(batches, responses):
+            if isinstance(response, Exception):
+                logger.warning("Failed to delete %d files: %s", len(batch), response)
+                failed.extend(batch)
+            else:
+                failed.extend(error["Key"] for error in response.get("Errors", []))
+        return failed
+
+    def presign(self, key: str, expiration: int) -> str:
+        # Signing is computed locally (no network call)
+        return self.s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': key},
+            ExpiresIn=expiration,
+        )
+
+    async def list(self, prefix: str = "") -> list[str]:
+        def list_keys():
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            return [
+                item["Key"]
+                for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix)
+                for item in page.get("Contents", [])
+            ]
+        return await self._run(list_keys)
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Local disk storage, for development, tests and offline benchmarks.
+
+    Content is stored once under objects/<aa>/<bb>/<sha256>, sharded on the first
+    hash bytes. Each key is a hard link to its object under keys/<key>, so identical
+    files share their disk blocks, and an object is removed with its last key.
+    Read URLs are HMAC-signed links to the /storage endpoint.
+    """
+    name = "local"
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.keys_dir = os.path.join(self.root, "keys")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        for directory in (self.objects_dir, self.keys_dir, self.tmp_dir):
+            os.makedirs(directory, exist_ok=True)
+        # Serializes linking and releasing objects within the process
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:4], digest)
+
+    def path(self, key: str) -> str:
+        """
+        Path of a key on disk. Raises ValueError for keys escaping the storage root.
+        """
+        path = os.path.abspath(os.path.join(self.keys_dir, key))
+        if os.path.commonpath([path, self.keys_dir]) != self.keys_dir or path == self.keys_dir:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    @staticmethod
+    def _file_digest(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(LOCAL_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _linked_digest(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """
+        Digest of the object a key refers to, when that key may be its last link.
+        With hard links, nlink counts the object and every key sharing it.
+        """
+        return self._file_digest(path) if stat.st_nlink <= 2 else None
+
+    def _release_object(self, digest: str):
+        """
+        Removes an object no key links to anymore.
+        """
+        object_path = self._object_path(digest)
+        try:
+            if os.stat(object_path).st_nlink == 1:
+                os.remove(object_path)
+        except FileNotFoundError:
+            pass
+
+    def _release(self, path: str):
+        """
+        Removes a key, then its object if no other key links to it.
+        """
+        try:
+            digest = self._linked_digest(path, os.stat(path))
+        except FileNotFoundError:
+            return
+        os.remove(path)
+        if digest:
+            self._release_object(digest)
+
+    def _commit(self, tmp_path: str, digest: str, key: str):
+        """
+        Points `key` at the object holding the content of tmp_path. The key is swapped
+        atomically, and its previous object is released only once nothing refers to it.
+        """
+        target = self.path(key)
+        object_path = self._object_path(digest)
+        with self._lock:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            if os.path.exists(object_path):
+                os.remove(tmp_path) # Same content already stored
+            else:
+                os.replace(tmp_path, object_path)
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                current = os.stat(target)
+            except FileNotFoundError:
+                previous = None
+            else:
+                if os.path.samestat(current, os.stat(object_path)):
+                    return # Already linked to this object
+                previous = self._linked_digest(target, current)
+                if previous == digest:
+                    # Own copy of the same content (no hard links): keep it, and drop
+                    # the object if it was only just stored for this put
+                    self._release_object(digest)
+                    return
+
+            # Staged in tmp/, on the same filesystem as the key, then renamed over it
+            staged = os.path.join(self.tmp_dir, f"{digest}.{os.urandom(8).hex()}")
+            try:
+                try:
+                    os.link(object_path, staged)
+                except OSError:
+                    # No hard links on this filesystem: the key gets its own copy
+                    shutil.copyfile(object_path, staged)
+                os.replace(staged, target)
+            finally:
+                if os.path.exists(staged):
+                    os.remove(staged)
+
+            if previous:
+                self._release_object(previous)
+
+    async def put(self, key: str, source, content_type: Optional[str] = None) -> str:
+        self.path(key)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+
+        def write(tmp, chunk: bytes):
+            digest.update(chunk)
+            tmp.write(chunk)
+
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async for chunk in iter_parts(source, LOCAL_CHUNK_SIZE):
+                    await asyncio.to_thread(write, tmp, chunk)
+            await asyncio.to_thread(self._commit, tmp_path, digest.hexdigest(), key)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return key
+
+    def open_stream(self, key: str, chunk_size: int = 64 * 1024):
+        f = open(self.path(key), "rb")
+
+        def read():
+            with f:
+                while chunk := f.read(chunk_size):
+                    yield chunk
+        return read()
+
+    async def delete(self, keys: list[str]) -> list[str]:
+        def delete_keys():
+            failed = []
+            with self._lock:
+                for key in keys:
+                    try:
+                        self._release(self.path(key))
+                    except Exception as e:
+                        logger.exception("Failed to delete file %s", key)
+                        failed.append(key)
+            return failed
+        return await asyncio.to_thread(delete_keys)
+
+    def _signature(self, key: str, expires: int) -> str:
+        message = f"{key}\n{expires}".encode("utf-8")
+        return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+    def presign(self, key: str, expiration: int) -> str:
+        expires = int(time.time()) + expiration
+        query = urlencode({"expires": expires, "signature": self._signature(key, expires)})
+        return f"{settings.STORAGE_PUBLIC_URL}{settings.API_V1_STR}/storage/{quote(key)}?{query}"
+
+    def verify(self, key: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(key, expires), signature)
+
+    async def list(self, prefix: str = "") -> list[str]:
+        def list_keys():
+            keys = []
+            for directory, _, files in os.walk(self.keys_dir):
+                for name in files:
+                    key = os.path.relpath(os.path.join(directory, name), self.keys_dir).replace(os.sep, "/")
+                    if key.startswith(prefix):
+                        keys.append(key)
+            return sorted(keys)
+        return await asyncio.to_thread(list_keys)
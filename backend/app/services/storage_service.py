@@ -1,71 +1,131 @@
-import boto3
-from botocore.exceptions import NoCredentialsError
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Optional
 from fastapi import UploadFile
+from botocore.exceptions import NoCredentialsError
+from app.core import metrics, tracing
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.services.storage_backends import StorageBackend, S3StorageBackend, LocalStorageBackend
 import uuid
 import os
 
+logger = logging.getLogger(__name__)
+
+def get_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorageBackend(settings.LOCAL_STORAGE_DIR)
+    return S3StorageBackend()
+
 class StorageService:
-    def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            endpoint_url=settings.R2_ENDPOINT,
-            aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-            region_name=settings.R2_REGION
-        )
-        self.bucket_name = settings.R2_BUCKET
+    """
+    Entry point for documents and images: invoices, SEPA files and logos.
+    Data goes to the backend selected by STORAGE_BACKEND.
+    """
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = backend or get_backend()
         self.public_base = settings.R2_PUBLIC_BASE
+        # key -> (expiration, presigned URL)
+        self._presigned_urls = TTLCache(maxsize=settings.STORAGE_PRESIGN_CACHE_SIZE)
+
+    @contextmanager
+    def _timed(self, operation: str):
+        with tracing.child_span(f"storage.{operation}", backend=self.backend.name), \
+                metrics.STORAGE_DURATION.labels(operation, self.backend.name).time():
+            yield
+
+    def _key(self, file_identifier: str) -> str:
+        if file_identifier.startswith(self.public_base):
+            return file_identifier.replace(f"{self.public_base}/", "")
+        return file_identifier
 
     async def upload_file(self, file: UploadFile, folder: str = "uploads") -> str:
         """
-        Uploads a file to R2 and returns the public URL.
+        Uploads a file and returns its key.
         """
         try:
             file_extension = os.path.splitext(file.filename)[1]
             unique_filename = f"{folder}/{uuid.uuid4()}{file_extension}"
-            
-            # Read file content
-            file_content = await file.read()
-            
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=unique_filename,
-                Body=file_content,
-                ContentType=file.content_type
-            )
-            
+
+            await self.upload_stream(file, unique_filename, content_type=file.content_type)
+
             # Reset file pointer for potential future use
             await file.seek(0)
-            
+
             return unique_filename
         except NoCredentialsError:
             raise Exception("Credentials not available")
         except Exception as e:
             raise Exception(f"Failed to upload file: {str(e)}")
 
-    def delete_file(self, file_identifier: str):
+    async def upload_files(self, files: list[UploadFile], folder: str = "uploads") -> list[str]:
+        """
+        Uploads several files concurrently; concurrency is bounded by the backend.
+        Returns the keys in the order of the files.
+        """
+        return await asyncio.gather(*(self.upload_file(file, folder) for file in files))
+
+    async def upload_stream(self, source, key: str, content_type: Optional[str] = None) -> str:
+        """
+        Stores bytes, a file object or an iterable of byte chunks under `key`, without
+        reading it whole into memory. Returns the key.
+        """
+        with self._timed("put"):
+            await self.backend.put(key, source, content_type)
+        self._presigned_urls.invalidate(key)
+        return key
+
+    async def delete_file(self, file_identifier: str):
         """
-        Deletes a file from R2 given its key or public URL.
+        Deletes a file given its key or public URL.
         """
+        key = self._key(file_identifier)
+        self._presigned_urls.invalidate(key)
         try:
-            key = file_identifier
-            if file_identifier.startswith(self.public_base):
-                key = file_identifier.replace(f"{self.public_base}/", "")
-            
-            # Also handle if it's a full URL but not matching public_base (e.g. if config changed)
-            # But for now, we assume it's either key or public_base prefixed.
-            
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=key
-            )
-        except Exception as e:
-            print(f"Failed to delete file {file_identifier}: {str(e)}")
+            with self._timed("delete"):
+                failed = await self.backend.delete([key])
+            if failed:
+                logger.warning("Failed to delete file %s", file_identifier)
+        except Exception:
+            logger.exception("Failed to delete file %s", file_identifier)
+
+    async def delete_files(self, file_identifiers: list[str]) -> list[str]:
+        """
+        Deletes many files in batches. Returns the keys that could not be deleted.
+        """
+        keys = [self._key(identifier) for identifier in file_identifiers]
+        for key in keys:
+            self._presigned_urls.invalidate(key)
+        with self._timed("delete"):
+            return await self.backend.delete(keys)
+
+    async def list_files(self, prefix: str = "") -> list[str]:
+        with self._timed("list"):
+            return await self.backend.list(prefix)
+
+    def open_stream(self, object_name: str, chunk_size: int = 64 * 1024):
+        """
+        Opens an object for reading and returns an iterator over its content.
+        Raises if the object cannot be fetched, before any chunk is produced.
+        Blocking: meant for sync generators that Starlette runs in its threadpool.
+        """
+        with self._timed("open"):
+            return self.backend.open_stream(self._key(object_name), chunk_size=chunk_size)
+
+    async def get_stream(self, object_name: str, chunk_size: int = 64 * 1024):
+        """
+        open_stream for async code: the object is opened off the event loop, and the
+        returned (blocking) iterator can be handed to a StreamingResponse.
+        """
+        return await asyncio.to_thread(self.open_stream, object_name, chunk_size)
 
     def get_presigned_url(self, object_name: str, expiration: int = 3600) -> str:
         """
-        Generate a presigned URL to share an S3 object
+        Generate a presigned URL to share an object.
+        Signing is computed locally (no network call), so it stays synchronous.
+        URLs are cached per key until they get within STORAGE_PRESIGN_CACHE_MARGIN
+        seconds of expiring.
         """
         try:
             # If the object_name is a full URL, try to extract the key
@@ -82,13 +142,17 @@ class StorageService:
                     # Or just try to treat the last part as key? No, that's dangerous.
                     pass
 
-            response = self.s3_client.generate_presigned_url('get_object',
-                                                            Params={'Bucket': self.bucket_name,
-                                                                    'Key': key},
-                                                            ExpiresIn=expiration)
+            cached = self._presigned_urls.get(key)
+            if cached and cached[0] == expiration:
+                return cached[1]
+
+            response = self.backend.presign(key, expiration)
+            cache_ttl = expiration - settings.STORAGE_PRESIGN_CACHE_MARGIN
+            if cache_ttl > 0:
+                self._presigned_urls.set(key, (expiration, response), ttl=cache_ttl)
             return response
-        except Exception as e:
-            print(f"Error generating presigned URL: {e}")
+        except Exception:
+            logger.exception("Error generating presigned URL for %s", object_name)
             return object_name # Fallback to original if failure
 
 
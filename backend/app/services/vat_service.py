@@ -1,7 +1,12 @@
+from app.core.tracing import traced
 from app.models.actor import ActorType
 
 class VATService:
+    # Auction house fees (buyer, seller and platform) are always taxed at the standard rate
+    FEES_VAT_RATE = 0.20
+
     @staticmethod
+    @traced("vat.calculate_lines", root=False)
     def calculate_lines(lot, buyer_fee_rate: float, platform_fee_rate: float = 0.0):
         """
         Calculates VAT details for a Lot.
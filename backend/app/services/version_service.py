@@ -0,0 +1,35 @@
+from typing import Optional
+from sqlalchemy import or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.auction import Auction
+from app.models.lot import Lot
+
+class VersionService:
+    """
+    Data versions behind the ETags of the read endpoints. Write paths bump them in
+    their own transaction, so a new version is visible exactly when the data is.
+    """
+    @staticmethod
+    async def bump_auctions(db: AsyncSession, *auction_ids: int):
+        ids = {auction_id for auction_id in auction_ids if auction_id is not None}
+        if ids:
+            await db.execute(
+                update(Auction).where(Auction.id.in_(ids)).values(version=Auction.version + 1)
+            )
+
+    @staticmethod
+    async def bump_auctions_of_actor(db: AsyncSession, actor_id: int):
+        """
+        Actor names and bank details appear in the results and settlements of every
+        auction the actor sold or bought in.
+        """
+        lots = select(Lot.auction_id).where(or_(Lot.seller_id == actor_id, Lot.buyer_id == actor_id))
+        await db.execute(
+            update(Auction).where(Auction.id.in_(lots)).values(version=Auction.version + 1)
+        )
+
+    @staticmethod
+    async def auction_version(db: AsyncSession, auction_id: int) -> Optional[int]:
+        result = await db.execute(select(Auction.version).where(Auction.id == auction_id))
+        return result.scalar()
@@ -0,0 +1,93 @@
+import argparse
+import random
+import sys
+import time
+import zlib
+import orjson
+
+def results_payload(count: int) -> bytes:
+    # Shape of /reconciliation/{id}/results
+    statuses = ["SOLD", "UNSOLD", "ANOMALIE"]
+    return orjson.dumps([
+        {
+            "id": i,
+            "lot_number": i,
+            "description": f"Lot {i} - {random.choice(['Commode Louis XV', 'Tableau huile sur toile', 'Vase Gallé', 'Montre gousset'])}",
+            "hammer_price": random.randint(10, 5000),
+            "status": random.choice(statuses),
+            "seller_name": f"Vendeur {random.randint(1, 300)}",
+            "buyer_name": f"Acheteur {random.randint(1, 800)}",
+        }
+        for i in range(1, count + 1)
+    ])
+
+def actors_payload(count: int) -> bytes:
+    # Shape of /actors/
+    return orjson.dumps([
+        {
+            "id": i,
+            "name": f"Acteur {i}",
+            "type": random.choice(["SELLER", "BUYER"]),
+            "email": f"acteur{i}@example.com",
+            "phone_number": f"06{random.randint(10000000, 99999999)}",
+            "siren_siret": None,
+            "address": f"{random.randint(1, 200)} rue de la Paix, 75002 Paris",
+            "iban": "FR7630006000011234567890189",
+            "bic": "BNPARFXX",
+            "vat_subject": False,
+        }
+        for i in range(1, count + 1)
+    ])
+
+def csv_payload(count: int) -> bytes:
+    lines = ["Lot;Vendeur;Designation;Adjudication"]
+    for i in range(1, count + 1):
+        lines.append(f"{i};Vendeur {random.randint(1, 300)};Lot {i} description;{random.randint(10, 5000)}")
+    return "\n".join(lines).encode("utf-8")
+
+def compress(data: bytes, level: int, chunk_size: int) -> bytes:
+    # Same calls as CompressionMiddleware on a streamed response
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    out = [compressor.compress(data[i:i + chunk_size]) for i in range(0, len(data), chunk_size)]
+    out.append(compressor.flush())
+    return b"".join(out)
+
+def best_of(repeat: int, fn, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def run(args) -> bool:
+    random.seed(0)
+    bytes_per_ms = args.bandwidth_mbit * 1_000_000 / 8 / 1000
+    payloads = {
+        "results": results_payload(args.rows),
+        "actors": actors_payload(args.rows),
+        "csv export": csv_payload(args.rows),
+    }
+    for name, data in payloads.items():
+        identity_ms = len(data) / bytes_per_ms
+        print(f"{name}: {len(data) / 1024:.0f} KiB, {identity_ms:.0f}ms to transfer at {args.bandwidth_mbit} Mbit/s")
+        for level in args.levels:
+            compressed = compress(data, level, args.chunk_size)
+            cpu_ms = best_of(args.repeat, compress, data, level, args.chunk_size)
+            transfer_ms = len(compressed) / bytes_per_ms
+            print(
+                f"  level {level}: {len(compressed) / 1024:.0f} KiB (x{len(data) / len(compressed):.1f}), "
+                f"cpu={cpu_ms:.1f}ms, saved {(len(data) - len(compressed)) / 1024:.0f} KiB, "
+                f"total {cpu_ms + transfer_ms:.0f}ms vs {identity_ms:.0f}ms"
+            )
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU cost of gzip response compression versus bytes saved.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 3, 5, 6, 9])
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Size of the streamed body chunks")
+    parser.add_argument("--bandwidth-mbit", type=float, default=5.0, help="Client bandwidth (venue Wi-Fi)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(0 if run(args) else 1)
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import httpx
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def login_storm(client: httpx.AsyncClient, args, statuses: dict):
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def login():
+        async with semaphore:
+            response = await client.post(
+                f"{args.api}/login/access-token",
+                data={"username": args.email, "password": args.password},
+            )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(login() for _ in range(args.logins)))
+
+async def probe(client: httpx.AsyncClient, url: str, headers: dict, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(url, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+async def run(args) -> bool:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        response = await client.post(
+            f"{args.api}/login/access-token",
+            data={"username": args.email, "password": args.password},
+        )
+        if response.status_code != 200:
+            print(f"Login failed ({response.status_code}): {response.text}")
+            return False
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        # Baseline: non-login endpoint alone
+        stop = asyncio.Event()
+        baseline = []
+        task = asyncio.create_task(probe(client, args.probe_path, headers, stop, baseline))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        await task
+
+        # Same endpoint during the login storm
+        stop = asyncio.Event()
+        during = []
+        statuses = {}
+        task = asyncio.create_task(probe(client, args.probe_path, headers, stop, during))
+        start = time.perf_counter()
+        await login_storm(client, args, statuses)
+        storm_seconds = time.perf_counter() - start
+        stop.set()
+        await task
+
+    print(f"Login storm: {args.logins} logins, {args.concurrency} concurrent, {storm_seconds:.1f}s")
+    print(f"  login statuses: {dict(sorted(statuses.items()))}")
+    for label, latencies in (("baseline", baseline), ("during storm", during)):
+        print(
+            f"{args.probe_path} {label}: n={len(latencies)} "
+            f"p50={percentile(latencies, 0.50):.1f}ms p99={percentile(latencies, 0.99):.1f}ms "
+            f"max={max(latencies, default=0):.1f}ms mean={statistics.fmean(latencies) if latencies else 0:.1f}ms"
+        )
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure API latency while many users log in at once.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--api", default="/api/v1")
+    parser.add_argument("--email", default="clerk@auctify.com")
+    parser.add_argument("--password", default="clerk")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe-path", default="/api/v1/auctions/", help="Non-login endpoint to time")
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
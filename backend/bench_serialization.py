@@ -0,0 +1,106 @@
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from fastapi.encoders import jsonable_encoder
+from app.core.serialization import ORJSONResponse
+from app.models.invoice import InvoiceStatus
+from app.models.settlement import SettlementStatus
+from app.schemas.invoice import InvoicePage
+from app.schemas.settlement import SettlementPage
+
+def invoice_rows(count: int) -> list[dict]:
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, count + 1):
+        total_excl = round(random.uniform(10, 5000), 2)
+        rows.append({
+            "id": i,
+            "number": f"F2024-{i:06d}",
+            "buyer_id": random.randint(1, 2000),
+            "auction_id": 1,
+            "total_excl": total_excl,
+            "total_vat": round(total_excl * 0.2, 2),
+            "total_incl": round(total_excl * 1.2, 2),
+            "status": InvoiceStatus.VALIDATED,
+            "signature_date": start + timedelta(minutes=i),
+            "hash": f"{i:064x}",
+        })
+    return rows
+
+def settlement_rows(count: int) -> list[dict]:
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, count + 1):
+        hammer_total = round(random.uniform(10, 5000), 2)
+        seller_id = random.randint(1, 2000)
+        rows.append({
+            "id": i,
+            "auction_id": 1,
+            "seller_id": seller_id,
+            "hammer_total": hammer_total,
+            "seller_fees": round(hammer_total * 0.1, 2),
+            "seller_fees_vat": round(hammer_total * 0.02, 2),
+            "amount": round(hammer_total * 0.88, 2),
+            "status": SettlementStatus.CREATED,
+            "batch_id": None,
+            "created_at": start + timedelta(minutes=i),
+            "seller": {"id": seller_id, "name": f"Vendeur {seller_id}", "iban": "FR7630006000011234567890189"},
+        })
+    return rows
+
+def as_objects(rows: list[dict]) -> list[SimpleNamespace]:
+    """
+    Attribute access like the ORM instances the endpoints used to return.
+    """
+    return [
+        SimpleNamespace(**{k: SimpleNamespace(**v) if isinstance(v, dict) else v for k, v in row.items()})
+        for row in rows
+    ]
+
+def before(page_model, objects: list) -> bytes:
+    # FastAPI's default path: response_model validation, jsonable_encoder, json.dumps
+    page = page_model.model_validate({"items": objects, "total": len(objects), "skip": 0, "limit": len(objects)})
+    return json.dumps(jsonable_encoder(page), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def after(rows: list[dict]) -> bytes:
+    return ORJSONResponse({"items": rows, "total": len(rows), "skip": 0, "limit": len(rows)}).body
+
+def best_of(repeat: int, fn, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def run(args) -> bool:
+    ok = True
+    for label, page_model, rows in (
+        ("invoices", InvoicePage, invoice_rows(args.rows)),
+        ("settlements", SettlementPage, settlement_rows(args.rows)),
+    ):
+        objects = as_objects(rows)
+        if json.loads(before(page_model, objects)) != json.loads(after(rows)):
+            print(f"{label}: payloads differ")
+            ok = False
+
+        before_ms = best_of(args.repeat, before, page_model, objects)
+        after_ms = best_of(args.repeat, after, rows)
+        per_10k = 10000 / args.rows
+        print(
+            f"{label}: {args.rows} rows, "
+            f"before={before_ms * per_10k:.1f}ms/10k rows after={after_ms * per_10k:.1f}ms/10k rows "
+            f"(x{before_ms / after_ms:.1f})"
+        )
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare list endpoint serialization before and after orjson.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(0 if run(args) else 1)
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import io
+import sys
+import os
+from contextlib import asynccontextmanager
+import httpx
+from fastapi import UploadFile
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.db.query_stats import assert_max_queries, track_queries
+from app.db.session import engine
+from app.main import app
+from app.models.lot import Lot
+from app.models.user import UserRole
+from app.services.actor_service import actor_ids
+from app.services.import_service import ImportService
+from app.services.reconciliation_service import ReconciliationService
+
+# Statements each list endpoint may run, whatever the page size: more means a
+# per-row (N+1) query crept in. Authentication is stubbed out and not counted.
+QUERY_BUDGETS = [
+    ("/invoices/{auction_id}/list", 3), # Version (ETag), count, page
+    ("/settlements/{auction_id}/list", 2), # Count, page joined with sellers
+    ("/settlements/batches", 1),
+]
+
+# Pipelines touch every row, but their statements must grow with the actors they
+# meet, not with the rows: a fixed part (loads, version bump, batched flushes,
+# savepoints) plus a few statements per distinct actor (lookups, insert).
+IMPORT_FIXED, IMPORT_PER_SELLER = 12, 2 # Seller lookup, insert
+RECONCILIATION_FIXED, RECONCILIATION_PER_BUYER = 12, 3 # Lookup by email, by name, insert
+ROWS_PER_INSERT_BATCH = 1000
+
+async def check_endpoints(args) -> bool:
+    app.dependency_overrides[deps.get_current_user] = lambda: deps.CurrentUser(0, UserRole.ADMIN, True)
+    ok = True
+    # Requests run in this task, so the query counter sees every statement
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        for path, budget in QUERY_BUDGETS:
+            url = settings.API_V1_STR + path.format(auction_id=args.auction_id)
+            try:
+                with assert_max_queries(budget) as stats:
+                    response = await client.get(url, params={"limit": args.limit})
+            except AssertionError as e:
+                print(f"FAIL {url}: {e}")
+                ok = False
+                continue
+            if response.status_code != 200:
+                print(f"FAIL {url}: HTTP {response.status_code} {response.text[:200]}")
+                ok = False
+                continue
+            print(f"ok   {url}: {stats.count}/{budget} queries")
+    app.dependency_overrides.clear()
+    return ok
+
+@asynccontextmanager
+async def rolled_back_session():
+    """
+    A session whose commits only release savepoints: everything is rolled back at exit.
+    """
+    async with engine.connect() as connection:
+        await connection.begin()
+        async with AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False) as db:
+            yield db
+        await connection.rollback()
+    # Actor ids seen inside the rolled back transaction
+    actor_ids.clear()
+
+async def distinct_actors(db: AsyncSession, auction_id: int, column) -> int:
+    result = await db.execute(select(func.count(func.distinct(column))).where(Lot.auction_id == auction_id))
+    return result.scalar() or 0
+
+async def check_current_user(args) -> bool:
+    token = security.create_access_token(args.user_id)
+    deps.current_users.clear()
+    ok = True
+    async with rolled_back_session() as db:
+        for name, budget in (("get_current_user (cold)", 1), ("get_current_user (cached)", 0)):
+            try:
+                with assert_max_queries(budget) as stats:
+                    await deps.get_current_user(db=db, token=token)
+            except AssertionError as e:
+                print(f"FAIL {name}: {e}")
+                ok = False
+                continue
+            print(f"ok   {name}: {stats.count}/{budget} queries")
+    return ok
+
+async def check_pipeline(name: str, args, path: str, run, actor_column, fixed: int, per_actor: int) -> bool:
+    with open(path, "rb") as f:
+        content = f.read()
+    async with rolled_back_session() as db:
+        # Counted only: the budget depends on the actors the run met
+        with track_queries(record=True) as stats:
+            await run(db, args.auction_id, UploadFile(io.BytesIO(content), filename=os.path.basename(path)))
+        actors = await distinct_actors(db, args.auction_id, actor_column)
+        lots = (await db.execute(select(func.count(Lot.id)).where(Lot.auction_id == args.auction_id))).scalar()
+    budget = fixed + lots // ROWS_PER_INSERT_BATCH + per_actor * actors
+    if stats.count > budget:
+        statements = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(stats.statements, 1))
+        print(f"FAIL {name}: {stats.count} queries run for {actors} actors and {lots} lots, at most {budget} expected:\n{statements}")
+        return False
+    print(f"ok   {name}: {stats.count}/{budget} queries ({actors} actors, {lots} lots)")
+    return True
+
+async def run(args) -> bool:
+    ok = await check_endpoints(args)
+    if args.user_id is not None:
+        ok = await check_current_user(args) and ok
+    if args.mapping:
+        ok = await check_pipeline(
+            "import mapping", args, args.mapping, ImportService.import_mapping_for_auction,
+            Lot.seller_id, IMPORT_FIXED, IMPORT_PER_SELLER,
+        ) and ok
+    if args.reconciliation:
+        ok = await check_pipeline(
+            "reconciliation", args, args.reconciliation, ReconciliationService.reconcile_auction,
+            Lot.buyer_id, RECONCILIATION_FIXED, RECONCILIATION_PER_BUYER,
+        ) and ok
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the SQL statement budgets of the list endpoints, authentication and the "
+                    "import pipelines. Pipelines run in a transaction that is rolled back."
+    )
+    parser.add_argument("auction_id", type=int, help="Auction with invoices and settlements to list, and to run the pipelines on")
+    parser.add_argument("--limit", type=int, default=100, help="Page size requested")
+    parser.add_argument("--user-id", type=int, help="Active user to authenticate as (get_current_user budget)")
+    parser.add_argument("--mapping", help="Mapping Excel file to import (import mapping budget)")
+    parser.add_argument("--reconciliation", help="Sales CSV to reconcile (reconciliation budget)")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
@@ -0,0 +1,45 @@
+import asyncio
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.future import select
+from app.db.session import AsyncSessionLocal
+from app.models.company import CompanySettings
+from app.services.image_service import ImageService
+from app.services.storage_service import storage_service
+
+LOGO_FIELDS = ['logo_url', 'logo_bordereau', 'logo_facture', 'logo_decompte']
+
+async def generate_logo_variants() -> bool:
+    """
+    Generates the PDF and web variants of logos uploaded before variants existed.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(CompanySettings))
+        settings = result.scalars().first()
+
+    if not settings:
+        print("No company settings found.")
+        return True
+
+    ok = True
+    for field in LOGO_FIELDS:
+        key = getattr(settings, field)
+        if not key:
+            continue
+        key = ImageService.original_key(key)
+        try:
+            content = b"".join(await storage_service.get_stream(key))
+            variants = await asyncio.to_thread(ImageService.make_logo_variants, content)
+            await ImageService.store_logo_variants(key, variants)
+            print(f"{field}: variants stored for {key}")
+        except Exception as e:
+            print(f"{field}: cannot generate variants for {key}: {e}")
+            ok = False
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(generate_logo_variants()) else 1)
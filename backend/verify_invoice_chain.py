@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import AsyncSessionLocal
+from app.services.compliance_service import ComplianceService
+
+async def verify_invoice_chain(full: bool) -> bool:
+    async with AsyncSessionLocal() as db:
+        report = await ComplianceService.verify_chain(db, resume=not full)
+        await db.commit()
+
+    if report["resumed_from"]:
+        print(f"Resumed from checkpoint at invoice #{report['resumed_from']}")
+    print(f"Verified {report['verified']} invoices (last: #{report['last_invoice_id']})")
+
+    if report["error"]:
+        error = report["error"]
+        print(f"Chain broken at invoice #{error['invoice_id']} ({error['number']}): {error['reason']}")
+        return False
+
+    print("Invoice chain is valid.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the invoice hash chain.")
+    parser.add_argument("--full", action="store_true", help="Ignore checkpoints and rescan the whole history")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(verify_invoice_chain(args.full)) else 1)
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.storage_backends import LocalStorageBackend
+
+def read(backend: LocalStorageBackend, key: str) -> bytes:
+    return b"".join(backend.open_stream(key))
+
+def objects(backend: LocalStorageBackend) -> set[str]:
+    return {name for _, _, files in os.walk(backend.objects_dir) for name in files}
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+async def check(root: str, hard_links: bool) -> list[str]:
+    """
+    Puts, re-puts, overwrites and deletes keys; returns the failed checks.
+    """
+    backend = LocalStorageBackend(root)
+    first, second = b"first content" * 1000, b"second content" * 1000
+    failures = []
+
+    def expect(condition: bool, message: str):
+        if not condition:
+            failures.append(message)
+
+    await backend.put("a/logo.png", first)
+    await backend.put("a/logo.png", first)
+    expect(read(backend, "a/logo.png") == first, "same key put twice lost its content")
+    if hard_links:
+        # Without hard links every key is a standalone copy and objects are transient
+        expect(objects(backend) == {digest(first)}, "same key put twice left the wrong objects")
+
+    await backend.put("b/logo.png", first)
+    await backend.put("b/logo.png", first)
+    expect(read(backend, "b/logo.png") == first, "shared content put twice lost its content")
+
+    await backend.put("a/logo.png", second)
+    expect(read(backend, "a/logo.png") == second, "overwritten key does not hold the new content")
+    expect(read(backend, "b/logo.png") == first, "overwriting a key changed another key")
+
+    await backend.put("b/logo.png", second)
+    expect(read(backend, "b/logo.png") == second, "overwriting the last key of an object failed")
+
+    failed = await backend.delete(["a/logo.png", "b/logo.png"])
+    expect(not failed, f"could not delete {failed}")
+    expect(not await backend.list(), "deleted keys are still listed")
+    expect(not objects(backend), "objects outlived their last key")
+    expect(not os.listdir(backend.tmp_dir), "staging files were left behind")
+    return failures
+
+async def verify_local_storage() -> bool:
+    ok = True
+    for mode in ("hard links", "copies"):
+        with tempfile.TemporaryDirectory() as root:
+            if mode == "copies":
+                with mock.patch("os.link", side_effect=OSError("hard links not supported")):
+                    failures = await check(root, hard_links=False)
+            else:
+                failures = await check(root, hard_links=True)
+        for failure in failures:
+            print(f"[{mode}] {failure}")
+        print(f"Local storage with {mode}: {'FAILED' if failures else 'OK'}")
+        ok = ok and not failures
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the local content-addressed storage backend.")
+    parser.parse_args()
+    sys.exit(0 if asyncio.run(verify_local_storage()) else 1)
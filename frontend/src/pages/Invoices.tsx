@@ -28,7 +28,7 @@ export function Invoices() {
         setLoading(true)
         try {
             const response = await api.get(`/invoices/${saleId}/list`)
-            setInvoices(response.data)
+            setInvoices(response.data.items)
         } catch (err) {
             console.error(err)
         } finally {
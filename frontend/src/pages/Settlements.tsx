@@ -10,11 +10,11 @@ interface Settlement {
     id: number
     amount: number
     status: string
+    batch_id: number | null
     seller: {
         name: string
         iban: string
     }
-    xml_content?: string
 }
 
 export function Settlements() {
@@ -24,18 +24,17 @@ export function Settlements() {
     const [generating, setGenerating] = useState(false)
     const [message, setMessage] = useState("")
     const [error, setError] = useState("")
-    const [xmlContent, setXmlContent] = useState("")
+    // Every SEPA file of the sale: a run is split into several when it exceeds the bank limits
+    const [batchIds, setBatchIds] = useState<number[]>([])
 
     const fetchSettlements = async () => {
         if (!saleId) return
         setLoading(true)
         try {
             const response = await api.get(`/settlements/${saleId}/list`)
-            setSettlements(response.data)
-            // Check if any has XML content to enable download
-            if (response.data.length > 0 && response.data[0].xml_content) {
-                setXmlContent(response.data[0].xml_content)
-            }
+            setSettlements(response.data.items)
+            const ids = response.data.items.map((s: Settlement) => s.batch_id).filter((id: number | null): id is number => id !== null)
+            setBatchIds([...new Set<number>(ids)].sort((a, b) => a - b))
         } catch (err) {
             console.error(err)
         } finally {
@@ -52,26 +51,31 @@ export function Settlements() {
         setGenerating(true)
         setMessage("")
         setError("")
-        setXmlContent("")
         try {
             const response = await api.post(`/settlements/${saleId}/generate`)
             setMessage(response.data.message)
-            setXmlContent(response.data.xml_content)
+            setBatchIds(response.data.batch_ids)
             fetchSettlements()
         } catch (err: any) {
-            setError(err.response?.data?.detail || "Erreur lors de la génération")
+            const detail = err.response?.data?.detail
+            if (detail?.errors) {
+                // Bank details are validated before any SEPA file is written
+                setError(detail.errors.map((e: any) => `${e.seller_name} : ${e.field.toUpperCase()} ${e.value ?? ""} (${e.reason})`).join(" · "))
+            } else {
+                setError(detail || "Erreur lors de la génération")
+            }
         } finally {
             setGenerating(false)
         }
     }
 
-    const handleDownloadXml = () => {
-        if (!xmlContent) return
-        const blob = new Blob([xmlContent], { type: "text/xml" })
+    const handleDownloadXml = async (batchId: number) => {
+        const response = await api.get(`/settlements/batches/${batchId}/xml`, { responseType: "text" })
+        const blob = new Blob([response.data], { type: "text/xml" })
         const url = window.URL.createObjectURL(blob)
         const a = document.createElement("a")
         a.href = url
-        a.download = `SEPA_PAIN001_${new Date().toISOString().split('T')[0]}.xml`
+        a.download = `SEPA_PAIN001_${new Date().toISOString().split('T')[0]}_${batchId}.xml`
         document.body.appendChild(a)
         a.click()
         document.body.removeChild(a)
@@ -96,12 +100,12 @@ export function Settlements() {
                             </>
                         )}
                     </Button>
-                    {xmlContent && (
-                        <Button variant="outline" onClick={handleDownloadXml}>
+                    {batchIds.map((batchId, index) => (
+                        <Button key={batchId} variant="outline" onClick={() => handleDownloadXml(batchId)}>
                             <Download className="mr-2 h-4 w-4" />
-                            Télécharger SEPA XML
+                            Télécharger SEPA XML{batchIds.length > 1 ? ` (${index + 1}/${batchIds.length})` : ""}
                         </Button>
-                    )}
+                    ))}
                 </div>
             </div>
 